@@ -8,15 +8,31 @@ import os
 import time
 import json
 import logging
-import random
+import threading
 from datetime import datetime
-from flask import Flask, request, jsonify
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from flask import Flask, Response, request, jsonify
+from job_queue import JobQueue, JobAborted, JOB_QUEUED
+from waits import url_left, element_focused, textbox_contains, message_sent, network_idle
+from selector_ladder import SelectorLadder
+from page_probe import (profile_classified, session_checked, PAGE_NOT_FOUND, PAGE_PRIVATE,
+                        PAGE_FOLLOW_REQUIRED, PAGE_MESSAGEABLE, SESSION_LOGGED_IN, SESSION_LOGGED_OUT,
+                        SESSION_FETCH_SCRIPT, NAVIGATION_STATS_SCRIPT)
+from session_store import SessionStore, SESSION_COOKIE
+from failures import (FAILURE_TIMEOUT, FAILURE_STALE_ELEMENT, FAILURE_CLICK_INTERCEPTED, FAILURE_BROWSER_ERROR,
+                      FAILURE_BROWSER_DISCONNECTED,
+                      FAILURE_BROWSER_UNAVAILABLE, FAILURE_BUTTON_NOT_FOUND, FAILURE_SEND_BUTTON_NOT_FOUND,
+                      FAILURE_NOT_LOGGED_IN, FAILURE_SESSION_EXPIRED, FAILURE_UNCONFIRMED, FAILURE_INVALID,
+                      FAILURE_ERROR, failure_class, failure_message, is_retryable)
+from procstat import process_tree_rss_mb
+from metrics import REGISTRY
+from browser_worker import BrowserWorker, SingleFlight
+from rate_limiter import RateLimiter, LIMIT_MESSAGES
+from dedup_index import DedupIndex
+from recipient_cache import RecipientCache
+from callbacks import CallbackNotifier
+from job_stream import JobStream, ndjson, server_sent_events
+from validation import ValidationError, validate_dm_list
+from sheet_writer import SheetWriter, GspreadSink, MemorySink
 
 # 設定日誌
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -28,9 +44,10 @@ app = Flask(__name__)
 INSTAGRAM_CONFIG = {
     'username': os.getenv('INSTAGRAM_USERNAME', 'your_username'),
     'password': os.getenv('INSTAGRAM_PASSWORD', 'your_password'),
-    'base_url': 'https://www.instagram.com',
-    'login_url': 'https://www.instagram.com/accounts/login/',
+    # 可指向本地模擬伺服器做效能測試（benchmarks/fake_instagram.py）
+    'base_url': os.getenv('INSTAGRAM_BASE_URL', 'https://www.instagram.com').rstrip('/'),
 }
+INSTAGRAM_CONFIG['login_url'] = INSTAGRAM_CONFIG['base_url'] + '/accounts/login/'
 
 # 發送限制設定
 RATE_LIMITS = {
@@ -40,21 +57,245 @@ RATE_LIMITS = {
     'max_interval': int(os.getenv('MAX_INTERVAL', '180')),
 }
 
+# 等待設定：所有等待都以頁面狀態為準，以下為單一等待條件的上限
+WAIT_CONFIG = {
+    'max_wait': float(os.getenv('MAX_WAIT', '15')),
+    'poll_interval': float(os.getenv('WAIT_POLL_INTERVAL', '0.2')),
+    'network_idle': float(os.getenv('NETWORK_IDLE_TIME', '0.5')),
+    'selector_wait': float(os.getenv('SELECTOR_WAIT', '5')),  # 頁面載入後仍無法分類時的等待上限
+}
+
+# 發送路徑：profile 走個人頁面的訊息按鈕；inbox 從 /direct/new/ 直接開啟對話，失敗時退回個人頁面
+SEND_CONFIG = {
+    'path': os.getenv('SEND_PATH', 'profile').lower(),
+}
+
+# 訊息輸入方式：insert_text 以 CDP Input.insertText 一次插入整段文字；send_keys 為逐字模擬鍵盤輸入
+INPUT_CONFIG = {
+    'mode': os.getenv('MESSAGE_INPUT_MODE', 'insert_text').lower(),
+    'verify_timeout': float(os.getenv('INPUT_VERIFY_TIMEOUT', '2')),  # 確認插入內容完整的等待上限，逾時改用 send_keys
+}
+
+# 選擇器階梯：依序嘗試的候選選擇器，命中者會被優先嘗試，統計可由 /selectors 查詢
+SELECTOR_LADDERS = {
+    # 更全面的按鈕選擇器 - 基於實際 Instagram 界面
+    'message_button': SelectorLadder('message_button', [
+        # 標準文字選擇器 - 注意 Instagram 使用的是 "Message" 不是 "Messages"
+        "//div[text()='Message']",
+        "//div[text()='訊息']", 
+        "//span[text()='Message']",
+        "//span[text()='訊息']",
+        "//button[text()='Message']",
+        "//button[text()='訊息']",
+        
+        # Instagram 常見的按鈕結構
+        "//div[@role='button' and contains(., 'Message')]",
+        "//div[@role='button' and contains(., '訊息')]",
+        "//button[@type='button' and text()='Message']",
+        "//button[@type='button' and text()='訊息']",
+        
+        # 包含文字的選擇器
+        "//div[contains(text(), 'Message') and not(contains(text(), 'Messages'))]",
+        "//div[contains(text(), '訊息')]",
+        "//span[contains(text(), 'Message') and not(contains(text(), 'Messages'))]",
+        "//button[contains(text(), 'Message') and not(contains(text(), 'Messages'))]",
+        
+        # 基於 aria-label 的選擇器（Instagram 常用）
+        "//*[contains(@aria-label, 'Message ')]",
+        "//*[contains(@aria-label, '訊息')]",
+        "//*[@aria-label='Message']",
+    ], fallbacks=[
+        # Direct message 相關連結：側邊欄的「訊息」連結在每個登入後的頁面都會命中，只作為最後手段
+        "//a[contains(@href, '/direct/new/')]",
+        "//a[contains(@href, '/direct/')]",
+        
+        # 更寬泛的選擇器
+        "//button[contains(@class, 'message')]",
+        "//div[contains(@class, 'message')]",
+        "//*[contains(@data-testid, 'message')]"
+    ]),
+    'send_button': SelectorLadder('send_button', [
+        "//button[text()='Send']",
+        "//button[text()='傳送']",
+        "//button[contains(@type, 'submit')]"
+    ]),
+    'login_username': SelectorLadder('login_username', [
+        "//input[@name='username']",
+        "//input[@aria-label='Phone number, username, or email']",
+        "//input[@autocomplete='username']"
+    ], clickable=False),
+    'login_password': SelectorLadder('login_password', [
+        "//input[@name='password']",
+        "//input[@type='password']"
+    ], clickable=False),
+    'login_submit': SelectorLadder('login_submit', [
+        "//button[@type='submit']",
+        "//div[@role='button' and (text()='Log in' or text()='登入')]"
+    ]),
+    # 收件匣路徑（/direct/new/）：搜尋框、搜尋結果（{username} 會代入收件人）、開啟對話按鈕
+    'inbox_search': SelectorLadder('inbox_search', [
+        "//input[@name='queryBox']",
+        "//div[@role='dialog']//input[@placeholder='Search...']",
+        "//div[@role='dialog']//input[@placeholder='搜尋……']",
+        "//div[@role='dialog']//input[@type='text']"
+    ]),
+    'inbox_result': SelectorLadder('inbox_result', [
+        "//div[@role='dialog']//span[text()='{username}']/ancestor::div[@role='button'][1]",
+        "//div[@role='dialog']//span[text()='{username}']/ancestor::label[1]",
+        "//div[@role='dialog']//*[text()='{username}']"
+    ]),
+    'inbox_chat': SelectorLadder('inbox_chat', [
+        "//div[@role='dialog']//div[@role='button' and (text()='Chat' or text()='聊天')]",
+        "//div[@role='dialog']//button[text()='Chat' or text()='聊天']",
+        "//div[@role='dialog']//div[@role='button' and (text()='Next' or text()='下一步')]",
+        "//div[@role='dialog']//button[text()='Next' or text()='下一步']"
+    ]),
+}
+
+# 資料儲存設定（任務佇列、發送計數器）
+STORAGE_CONFIG = {
+    'db_path': os.getenv('BOT_DB_PATH', 'data/bot.db'),
+}
+
+# 重複發送防護：相同帳號 + 相同內容（或相同 idempotencyKey）在保留期間內只會發送一次，0 表示永久保留
+DEDUP_CONFIG = {
+    'ttl_days': float(os.getenv('DEDUP_TTL_DAYS', '30')),
+}
+
+# 收件人狀態快取：已確認無法發送的帳號在有效期間內不再開啟個人頁面（小時，0 表示不快取該狀態）
+RECIPIENT_CACHE_TTLS = {
+    PAGE_NOT_FOUND: float(os.getenv('RECIPIENT_TTL_NOT_FOUND_HOURS', '168')) * 3600,
+    PAGE_PRIVATE: float(os.getenv('RECIPIENT_TTL_PRIVATE_HOURS', '24')) * 3600,
+    PAGE_FOLLOW_REQUIRED: float(os.getenv('RECIPIENT_TTL_FOLLOW_REQUIRED_HOURS', '24')) * 3600,
+}
+
+# 發送重試設定：暫時性失敗（逾時、元素過期、瀏覽器錯誤）與會話失效在退避後重試，永久性失敗不重試
+RETRY_CONFIG = {
+    'max_retries': int(os.getenv('SEND_MAX_RETRIES', '2')),
+    'backoff': float(os.getenv('SEND_RETRY_BACKOFF_SECONDS', '5')),
+}
+
+# 結果回呼設定：/send_dms 帶 callback_url 時，結果累積成批次 POST 回呼叫端
+CALLBACK_CONFIG = {
+    'batch_size': int(os.getenv('CALLBACK_BATCH_SIZE', '10')),
+    'flush_interval': float(os.getenv('CALLBACK_FLUSH_SECONDS', '5')),
+    'max_retries': int(os.getenv('CALLBACK_MAX_RETRIES', '5')),
+    'backoff': float(os.getenv('CALLBACK_BACKOFF_SECONDS', '1')),
+}
+
+# 進度串流設定（/jobs/<job_id>/stream 沒有新結果時輸出 heartbeat 的間隔秒數）
+STREAM_CONFIG = {
+    'heartbeat': float(os.getenv('STREAM_HEARTBEAT_SECONDS', '15')),
+}
+
+# 試算表回寫設定：off 停用；gspread 以服務帳號寫回 Google Sheets；memory 為本地替代品（測試用）
+SHEETS_CONFIG = {
+    'writeback': os.getenv('SHEETS_WRITEBACK', 'off').lower(),
+    'credentials_file': os.getenv('GOOGLE_SHEETS_CREDENTIALS_FILE', 'credentials.json'),
+    'sheet_id': os.getenv('GOOGLE_SHEETS_ID', ''),
+    'worksheet': os.getenv('SHEETS_WORKSHEET', ''),
+    'start_column': os.getenv('SHEETS_RESULT_COLUMN', 'H'),  # 狀態、錯誤訊息、時間依序寫入此欄起的三欄
+    'batch_size': int(os.getenv('SHEETS_BATCH_SIZE', '50')),
+    'flush_interval': float(os.getenv('SHEETS_FLUSH_SECONDS', '0')),  # 0: 只在累積滿一批或任務結束時寫入
+}
+
+# 登入會話設定：保存 cookies，重啟後直接還原會話
+SESSION_CONFIG = {
+    'cookie_file': os.getenv('SESSION_COOKIE_FILE', 'data/session_cookies.json'),
+    # 選填：使用持久化的 Chrome 使用者資料夾（需掛載持久化磁碟）
+    'user_data_dir': os.getenv('CHROME_USER_DATA_DIR', ''),
+    # 每次發送前檢查 sessionid cookie；距離上次確認超過此秒數時再以 fetch 確認 Instagram 仍接受該會話（0 表示只檢查 cookie）
+    'verify_interval': float(os.getenv('SESSION_VERIFY_SECONDS', '300')),
+    'probe_path': '/accounts/edit/',
+}
+
+# 啟動設定：EAGER_START=true 時服務啟動即在背景初始化瀏覽器並登入
+STARTUP_CONFIG = {
+    'eager_start': os.getenv('EAGER_START', 'false').lower() == 'true',
+}
+
+# 資源封鎖設定：只下載 DM 流程需要的 HTML / JavaScript，圖片、影音、字型與第三方追蹤一律封鎖
+RESOURCE_BLOCKING = {
+    'enabled': os.getenv('BLOCK_RESOURCES', 'true').lower() == 'true',
+    'patterns': [
+        # 貼文、大頭貼與影片（scontent-*.cdninstagram.com / scontent-*.fbcdn.net）
+        '*scontent*',
+        '*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.svg*', '*.ico*',
+        '*.mp4*', '*.m4a*', '*.m4v*', '*.webm*',
+        '*.woff*', '*.ttf*', '*.otf*',
+        # 第三方追蹤
+        '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*connect.facebook.net*',
+    ] + [p.strip() for p in os.getenv('BLOCKED_URL_PATTERNS', '').split(',') if p.strip()],
+}
+
+# 瀏覽器回收設定：長時間運行的 Chrome 會累積記憶體，符合任一條件即重啟（0 表示停用該條件）
+RECYCLE_CONFIG = {
+    'max_navigations': int(os.getenv('RECYCLE_AFTER_NAVIGATIONS', '200')),
+    'max_rss_mb': int(os.getenv('RECYCLE_MAX_RSS_MB', '0')),
+    'idle_timeout': int(os.getenv('RECYCLE_IDLE_SECONDS', '0')),
+}
+
+# 效能指標：各階段耗時與發送結果，由 /metrics 以 Prometheus 文字格式輸出
+PHASE_SECONDS = REGISTRY.histogram('igbot_phase_seconds', 'DM 流程各階段耗時（秒）', ['phase'])
+MESSAGES_TOTAL = REGISTRY.counter('igbot_messages_total', 'DM 發送結果（依失敗原因分類）', ['result', 'reason'])
+DUPLICATES_TOTAL = REGISTRY.counter('igbot_duplicates_total', '因已發送過而略過的項目數')
+RECIPIENT_CACHE_LOOKUPS = REGISTRY.counter('igbot_recipient_cache_lookups_total', '收件人狀態快取查詢（hit / miss）', ['result'])
+SEND_RETRIES = REGISTRY.counter('igbot_send_retries_total', '暫時性失敗後重試發送的次數（依失敗原因分類）', ['reason'])
+SESSION_CHECKS = REGISTRY.counter('igbot_session_checks_total', '發送前的登入會話檢查結果', ['result'])
+RATE_LIMIT_WAITS = REGISTRY.counter('igbot_rate_limit_waits_total', '因發送限制而延後發送的次數', ['reason'])
+
 # 全域變量
 driver = None
-daily_sent_count = 0
-hourly_sent_count = 0
-last_reset_hour = datetime.now().hour
-last_sent_time = 0
+
+# Selenium 在第一次需要瀏覽器時才由 load_selenium() 載入，/health 等端點不必等待它
+webdriver = By = Keys = WebDriverWait = EC = Options = None
+StaleElementReferenceException = ElementClickInterceptedException = WebDriverException = TimeoutException = None
+InvalidSessionIdException = None
+
+def connection_refused(error):
+    """ChromeDriver 已結束時，WebDriver 指令會以連線被拒絕的錯誤失敗（urllib3 的 MaxRetryError 等）"""
+    while error is not None:
+        if isinstance(error, ConnectionRefusedError) or 'Connection refused' in str(error):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+def load_selenium():
+    """載入 Selenium（只在第一次呼叫時實際匯入）"""
+    global webdriver, By, Keys, WebDriverWait, EC, Options
+    global StaleElementReferenceException, ElementClickInterceptedException, WebDriverException, TimeoutException
+    global InvalidSessionIdException
+    if TimeoutException is not None:
+        return
+    start = time.monotonic()
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.chrome.options import Options
+    from selenium.common.exceptions import (StaleElementReferenceException, ElementClickInterceptedException,
+                                            WebDriverException, TimeoutException, InvalidSessionIdException)
+    logger.info(f"📦 已載入 Selenium，耗時 {time.monotonic() - start:.2f} 秒")
 
 class InstagramBot:
     def __init__(self):
         self.driver = None
         self.is_logged_in = False
+        self.session_store = SessionStore(SESSION_CONFIG['cookie_file'], INSTAGRAM_CONFIG['username'])
+        self.navigations = 0
+        self.recycles = 0
+        self.last_activity = time.time()
+        self.last_navigation = None
+        self.failure_reason = None
+        self.send_clicked = False
+        self.session_verified_at = None
         
+    @PHASE_SECONDS.timed(phase='driver_setup')
     def setup_driver(self):
         """設定 Chrome 瀏覽器 - Zeabur 優化版本"""
         try:
+            load_selenium()
             chrome_options = Options()
             chrome_options.add_argument('--headless=new')  # 使用新版 headless 模式
             chrome_options.add_argument('--no-sandbox')
@@ -62,7 +303,9 @@ class InstagramBot:
             chrome_options.add_argument('--disable-gpu')
             chrome_options.add_argument('--disable-extensions')
             chrome_options.add_argument('--disable-plugins')
-            chrome_options.add_argument('--disable-images')
+            # --disable-images 並不是有效的 Chrome 參數，改用 blink 設定關閉圖片，並以 CDP 封鎖其他資源
+            if RESOURCE_BLOCKING['enabled']:
+                chrome_options.add_argument('--blink-settings=imagesEnabled=false')
             # chrome_options.add_argument('--disable-javascript')  # 移除：Instagram 需要 JavaScript
             chrome_options.add_argument('--window-size=1920,1080')
             chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
@@ -82,6 +325,9 @@ class InstagramBot:
             chrome_options.add_argument('--disable-default-apps')
             chrome_options.add_argument('--disable-sync')
             
+            if SESSION_CONFIG['user_data_dir']:
+                chrome_options.add_argument(f"--user-data-dir={SESSION_CONFIG['user_data_dir']}")
+            
             # 使用系統安裝的 Chrome，讓 Selenium 自動管理 ChromeDriver
             from selenium.webdriver.chrome.service import Service
             from selenium.webdriver.common.service import utils
@@ -101,8 +347,12 @@ class InstagramBot:
                     logger.error("未安裝 webdriver-manager，請手動安裝: pip install webdriver-manager")
                     raise driver_error
             
+            self.navigations = 0
+            self.last_activity = time.time()
+            self.apply_resource_blocking()
             self.driver.set_page_load_timeout(30)
-            self.driver.implicitly_wait(10)
+            # 不使用隱式等待，所有等待都由 wait_until() 明確控制
+            self.driver.implicitly_wait(0)
             
             logger.info("✅ Chrome 瀏覽器設定完成")
             return True
@@ -111,6 +361,36 @@ class InstagramBot:
             logger.error(f"❌ 設定瀏覽器失敗: {str(e)}")
             return False
     
+    def wait_until(self, condition, timeout=None):
+        """等待頁面狀態成立，上限為 WAIT_CONFIG['max_wait'] 秒"""
+        return WebDriverWait(
+            self.driver,
+            timeout or WAIT_CONFIG['max_wait'],
+            poll_frequency=WAIT_CONFIG['poll_interval']
+        ).until(condition)
+    
+    def resolve(self, ladder, timeout=None, params=None):
+        """透過選擇器階梯取得元素，上限為 WAIT_CONFIG['max_wait'] 秒"""
+        return ladder.resolve(
+            self.driver,
+            timeout or WAIT_CONFIG['max_wait'],
+            poll_frequency=WAIT_CONFIG['poll_interval'],
+            params=params
+        )
+    
+    @PHASE_SECONDS.timed(phase='button_resolution')
+    def classify_profile(self, timeout=None):
+        """
+        判斷目前個人頁面的狀態，回傳 {'status', 'button', 'selector'}
+        status: not_found / private / follow_required / messageable / unknown
+        """
+        condition = profile_classified(SELECTOR_LADDERS['message_button'], WAIT_CONFIG['selector_wait'])
+        try:
+            return self.wait_until(condition, timeout or WAIT_CONFIG['max_wait'] + WAIT_CONFIG['selector_wait'])
+        except TimeoutException:
+            return condition.finish()
+    
+    @PHASE_SECONDS.timed(phase='login')
     def login(self):
         """登入 Instagram - 增強錯誤處理"""
         try:
@@ -119,48 +399,52 @@ class InstagramBot:
                 return False
                 
             logger.info("正在登入 Instagram...")
-            self.driver.get(INSTAGRAM_CONFIG['login_url'])
-            
-            # 等待頁面載入
-            WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located((By.NAME, "username"))
-            )
+            self.navigate(INSTAGRAM_CONFIG['login_url'])
             
-            # 輸入帳號密碼
-            username_input = self.driver.find_element(By.NAME, "username")
-            password_input = self.driver.find_element(By.NAME, "password")
+            # 等待頁面載入並取得帳號密碼欄位
+            username_input = self.resolve(SELECTOR_LADDERS['login_username'])
+            password_input = self.resolve(SELECTOR_LADDERS['login_password'])
             
             username_input.clear()
             username_input.send_keys(INSTAGRAM_CONFIG['username'])
-            time.sleep(1)
             
             password_input.clear()
             password_input.send_keys(INSTAGRAM_CONFIG['password'])
-            time.sleep(1)
             
             # 點擊登入按鈕
-            login_button = self.driver.find_element(By.XPATH, "//button[@type='submit']")
+            login_button = self.resolve(SELECTOR_LADDERS['login_submit'])
             login_button.click()
             
-            # 等待登入完成
-            time.sleep(8)
+            # 等待登入完成：離開登入頁，或出現錯誤提示
+            try:
+                self.wait_until(EC.any_of(
+                    url_left('/accounts/login'),
+                    EC.presence_of_element_located((By.XPATH, "//*[@role='alert' or @id='slfErrorAlert']"))
+                ))
+            except TimeoutException:
+                logger.warning("等待登入結果逾時")
             
             # 檢查是否需要處理安全驗證
             try:
-                # 檢查是否有 "Save Your Login Info" 提示
-                save_info_not_now = WebDriverWait(self.driver, 5).until(
-                    EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Not Now')]"))
-                )
-                save_info_not_now.click()
-                time.sleep(2)
+                # 檢查是否有 "Save Your Login Info" 提示，頁面閒置後仍未出現即略過
+                not_now_xpath = "//button[contains(text(), 'Not Now')]"
+                prompt = self.wait_until(EC.any_of(
+                    EC.element_to_be_clickable((By.XPATH, not_now_xpath)),
+                    network_idle(WAIT_CONFIG['network_idle'])
+                ))
+                if prompt is not True:
+                    prompt.click()
+                    self.wait_until(EC.staleness_of(prompt))
             except TimeoutException:
                 pass  # 沒有出現該提示，繼續
             
             # 檢查是否登入成功
             current_url = self.driver.current_url
-            if "instagram.com" in current_url and "login" not in current_url:
+            if current_url.startswith(INSTAGRAM_CONFIG['base_url']) and "login" not in current_url:
                 logger.info("✅ Instagram 登入成功")
                 self.is_logged_in = True
+                self.session_verified_at = time.monotonic()
+                self.save_session()
                 return True
             else:
                 logger.error(f"❌ Instagram 登入失敗，當前 URL: {current_url}")
@@ -170,149 +454,355 @@ class InstagramBot:
             logger.error(f"❌ Instagram 登入過程發生錯誤: {str(e)}")
             return False
     
+    def save_session(self):
+        """保存目前的登入 cookies"""
+        try:
+            self.session_store.save(self.driver.get_cookies())
+        except Exception as e:
+            logger.warning(f"保存登入會話失敗: {str(e)}")
+    
+    @PHASE_SECONDS.timed(phase='session_restore')
+    def restore_session(self):
+        """還原保存的登入會話，確認 Instagram 仍接受該會話才視為已登入"""
+        cookies = self.session_store.load()
+        if not cookies and not SESSION_CONFIG['user_data_dir']:
+            return False
+        
+        try:
+            if cookies:
+                self._set_cookies(cookies)
+            
+            self.navigate(INSTAGRAM_CONFIG['base_url'] + '/')
+            state = self.wait_until(session_checked())
+        except TimeoutException:
+            state = None
+        except Exception as e:
+            logger.warning(f"還原登入會話失敗: {str(e)}")
+            state = None
+        
+        if state == SESSION_LOGGED_IN:
+            logger.info("✅ 已還原保存的登入會話")
+            self.is_logged_in = True
+            self.session_verified_at = time.monotonic()
+            return True
+        
+        logger.info("保存的登入會話已失效，需要重新登入")
+        self.session_store.clear()
+        return False
+    
+    def check_session(self):
+        """
+        不導覽頁面的登入狀態檢查，回傳 False 表示會話已失效
+        每次都檢查 sessionid cookie 是否存在且未過期；距離上次確認超過 SESSION_VERIFY_SECONDS 時，
+        再於目前頁面以 fetch 請求需要登入的網址，確認 Instagram 仍接受該會話
+        """
+        cookie = self._session_cookie()
+        expires = (cookie or {}).get('expires', (cookie or {}).get('expiry'))
+        if cookie is None or (expires and 0 < expires <= time.time()):
+            SESSION_CHECKS.inc(result='cookie_missing')
+            logger.info("🔑 sessionid cookie 不存在或已過期")
+            return False
+        
+        interval = SESSION_CONFIG['verify_interval']
+        if not interval or (self.session_verified_at and time.monotonic() - self.session_verified_at < interval):
+            SESSION_CHECKS.inc(result='cookie_valid')
+            return True
+        
+        try:
+            state = self.driver.execute_async_script(
+                SESSION_FETCH_SCRIPT, INSTAGRAM_CONFIG['base_url'] + SESSION_CONFIG['probe_path'],
+                int(WAIT_CONFIG['max_wait'] * 1000)
+            )
+        except Exception as e:
+            logger.warning(f"登入會話確認失敗: {str(e)}")
+            state = None
+        
+        if state == SESSION_LOGGED_OUT:
+            SESSION_CHECKS.inc(result='rejected')
+            logger.info("🔑 Instagram 已不接受目前的登入會話")
+            return False
+        
+        # 無法判斷（例如目前不在 Instagram 頁面）時以 cookie 檢查為準，下次發送前再確認
+        if state == SESSION_LOGGED_IN:
+            self.session_verified_at = time.monotonic()
+        SESSION_CHECKS.inc(result='verified' if state == SESSION_LOGGED_IN else 'unverified')
+        return True
+    
+    def _session_cookie(self):
+        """取得 sessionid cookie：優先使用 CDP（不受目前頁面網域限制），不支援時改用 get_cookie"""
+        try:
+            cookies = self.driver.execute_cdp_cmd(
+                'Network.getCookies', {'urls': [INSTAGRAM_CONFIG['base_url'] + '/']}
+            )['cookies']
+            return next((cookie for cookie in cookies if cookie['name'] == SESSION_COOKIE), None)
+        except Exception:
+            return self.driver.get_cookie(SESSION_COOKIE)
+    
+    def _set_cookies(self, cookies):
+        """寫入 cookies：優先使用 CDP（不需先載入頁面），不支援時改用 add_cookie"""
+        try:
+            self.driver.execute_cdp_cmd('Network.setCookies', {'cookies': [
+                dict(
+                    {k: v for k, v in cookie.items() if k in ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite')},
+                    **({'expires': cookie['expiry']} if 'expiry' in cookie else {})
+                ) for cookie in cookies
+            ]})
+        except Exception:
+            self.navigate(INSTAGRAM_CONFIG['base_url'] + '/')
+            for cookie in cookies:
+                self.driver.add_cookie(cookie)
+    
+    @PHASE_SECONDS.timed(phase='message_total')
     def send_direct_message(self, username, message):
-        """發送 Instagram Direct Message - 增強穩定性"""
+        """發送 Instagram Direct Message - 增強穩定性（失敗原因記錄於 self.failure_reason）"""
+        self.failure_reason = None
+        self.send_clicked = False
         try:
             if not self.is_logged_in:
                 logger.error("尚未登入 Instagram")
-                return False
+                return self.fail(FAILURE_NOT_LOGGED_IN)
             
             logger.info(f"正在發送 DM 給 @{username}")
             
-            # 前往用戶頁面
-            user_url = f"{INSTAGRAM_CONFIG['base_url']}/{username}/"
-            self.driver.get(user_url)
+            # 開啟對話視窗：收件匣路徑失敗時改走個人頁面
+            opened = False
+            if SEND_CONFIG['path'] == 'inbox':
+                opened = self.open_composer_via_inbox(username)
+                if not opened:
+                    logger.info(f"收件匣路徑無法開啟 @{username} 的對話，改用個人頁面")
             
-            # 等待頁面載入
-            WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located((By.TAG_NAME, "main"))
-            )
-            
-            # 檢查用戶是否存在
-            if "Sorry, this page isn't available" in self.driver.page_source:
-                logger.error(f"❌ 用戶 @{username} 不存在或已被刪除")
+            if not opened and not self.open_composer_via_profile(username):
                 return False
             
-            # 尋找並點擊 "Message" 按鈕 - 擴展選擇器
-            message_button_found = False
+            return self.type_and_send(username, message)
             
-            # 更全面的按鈕選擇器 - 基於實際 Instagram 界面
-            button_selectors = [
-                # 標準文字選擇器 - 注意 Instagram 使用的是 "Message" 不是 "Messages"
-                "//div[text()='Message']",
-                "//div[text()='訊息']", 
-                "//span[text()='Message']",
-                "//span[text()='訊息']",
-                "//button[text()='Message']",
-                "//button[text()='訊息']",
-                
-                # Instagram 常見的按鈕結構
-                "//div[@role='button' and contains(., 'Message')]",
-                "//div[@role='button' and contains(., '訊息')]",
-                "//button[@type='button' and text()='Message']",
-                "//button[@type='button' and text()='訊息']",
-                
-                # 包含文字的選擇器
-                "//div[contains(text(), 'Message') and not(contains(text(), 'Messages'))]",
-                "//div[contains(text(), '訊息')]",
-                "//span[contains(text(), 'Message') and not(contains(text(), 'Messages'))]",
-                "//button[contains(text(), 'Message') and not(contains(text(), 'Messages'))]",
-                
-                # 基於 aria-label 的選擇器（Instagram 常用）
-                "//*[contains(@aria-label, 'Message ')]",
-                "//*[contains(@aria-label, '訊息')]",
-                "//*[@aria-label='Message']",
-                
-                # Direct message 相關連結
-                "//a[contains(@href, '/direct/')]",
-                "//a[contains(@href, '/direct/new/')]",
-                
-                # 更寬泛的選擇器
-                "//button[contains(@class, 'message')]",
-                "//div[contains(@class, 'message')]",
-                "//*[contains(@data-testid, 'message')]"
-            ]
-            
-            logger.info(f"嘗試尋找 @{username} 的訊息按鈕...")
+        except TimeoutException as e:
+            logger.error(f"❌ 發送 DM 給 @{username} 逾時: {e.msg}")
+            return self.fail(FAILURE_TIMEOUT)
+        except StaleElementReferenceException as e:
+            logger.error(f"❌ 發送 DM 給 @{username} 時頁面元素已更新: {e.msg}")
+            return self.fail(FAILURE_STALE_ELEMENT)
+        except ElementClickInterceptedException as e:
+            logger.error(f"❌ 發送 DM 給 @{username} 時點擊被遮擋: {e.msg}")
+            return self.fail(FAILURE_CLICK_INTERCEPTED)
+        except InvalidSessionIdException as e:
+            logger.error(f"❌ 發送 DM 給 @{username} 時瀏覽器會話已中斷: {e.msg}")
+            return self.disconnected()
+        except WebDriverException as e:
+            # 其他 WebDriver 錯誤（例如 send_keys 不支援的字元）只影響這一列，瀏覽器仍可繼續使用
+            logger.error(f"❌ 發送 DM 給 @{username} 時瀏覽器錯誤: {e.msg}")
+            return self.fail(FAILURE_BROWSER_ERROR)
+        except Exception as e:
+            if connection_refused(e):
+                logger.error(f"❌ 發送 DM 給 @{username} 時無法連線到 ChromeDriver: {str(e)}")
+                return self.disconnected()
+            logger.error(f"❌ 發送 DM 給 @{username} 失敗: {str(e)}")
+            return self.fail(FAILURE_ERROR)
+    
+    def fail(self, reason):
+        """記錄失敗原因（供重試判斷與 /metrics 分類統計）並回傳 False"""
+        # 已按下發送後才出錯時無法確定訊息是否送出，不可當成暫時性失敗重試
+        self.failure_reason = FAILURE_UNCONFIRMED if self.send_clicked else reason
+        return False
+    
+    def disconnected(self):
+        """瀏覽器已崩潰或斷線：關閉後下次嘗試會重新啟動並還原會話"""
+        self.close()
+        return self.fail(FAILURE_BROWSER_DISCONNECTED)
+    
+    def open_composer_via_profile(self, username):
+        """前往個人頁面並點擊訊息按鈕"""
+        # 前往用戶頁面
+        user_url = f"{INSTAGRAM_CONFIG['base_url']}/{username}/"
+        with PHASE_SECONDS.time(phase='profile_navigation'):
+            self.navigate(user_url)
+        
+        # 一次探測判斷頁面狀態並取得訊息按鈕
+        page = self.classify_profile()
+        status = page['status']
+        
+        if status == PAGE_NOT_FOUND:
+            logger.error(f"❌ 用戶 @{username} 不存在或已被刪除")
+            return self.fail(status)
+        
+        if status == PAGE_PRIVATE:
+            logger.error(f"@{username} 是私人帳號，無法發送訊息")
+            return self.fail(status)
+        
+        if status == PAGE_FOLLOW_REQUIRED:
+            logger.error(f"需要先關注 @{username} 才能發送訊息")
+            return self.fail(status)
+        
+        if status != PAGE_MESSAGEABLE and '/accounts/login' in self.driver.current_url:
+            logger.error(f"❌ 前往 @{username} 時被導向登入頁，登入會話已失效")
+            self.is_logged_in = False
+            # 保存的 cookie 已失效，重試時不可再還原，必須重新登入
+            self.session_store.clear()
+            return self.fail(FAILURE_SESSION_EXPIRED)
+        
+        if status != PAGE_MESSAGEABLE:
+            # 記錄頁面信息用於調試
+            logger.error(f"❌ 找不到 @{username} 的訊息按鈕")
+            logger.info(f"當前頁面 URL: {self.driver.current_url}")
+            if logger.isEnabledFor(logging.DEBUG):
+                page_source = self.driver.page_source
+                logger.debug(f"頁面原始碼 ({len(page_source)} 字元): {page_source[:2000]}")
+            return self.fail(FAILURE_BUTTON_NOT_FOUND)
+        
+        logger.info(f"✅ 找到訊息按鈕，使用選擇器: {page['selector']}")
+        page['button'].click()
+        return True
+    
+    @PHASE_SECONDS.timed(phase='inbox_open')
+    def open_composer_via_inbox(self, username):
+        """從 /direct/new/ 搜尋用戶並直接開啟對話，省去載入個人頁面"""
+        try:
+            self.navigate(INSTAGRAM_CONFIG['base_url'] + '/direct/new/')
             
-            for i, selector in enumerate(button_selectors, 1):
-                try:
-                    logger.info(f"嘗試選擇器 {i}/{len(button_selectors)}: {selector}")
-                    message_button = WebDriverWait(self.driver, 3).until(
-                        EC.element_to_be_clickable((By.XPATH, selector))
-                    )
-                    logger.info(f"✅ 找到訊息按鈕，使用選擇器: {selector}")
-                    message_button.click()
-                    message_button_found = True
-                    time.sleep(2)  # 等待點擊生效
-                    break
-                except TimeoutException:
-                    continue
-                except Exception as e:
-                    logger.warning(f"選擇器 {i} 出錯: {str(e)}")
-                    continue
+            search_input = self.resolve(SELECTOR_LADDERS['inbox_search'])
+            search_input.click()
+            search_input.send_keys(username)
             
-            if not message_button_found:
-                # 記錄頁面信息用於調試
-                logger.error(f"❌ 找不到 @{username} 的訊息按鈕")
-                logger.info(f"當前頁面 URL: {self.driver.current_url}")
-                
-                # 檢查是否是私人帳號
-                if "This Account is Private" in self.driver.page_source:
-                    logger.error(f"@{username} 是私人帳號，無法發送訊息")
-                    return False
-                    
-                # 檢查是否需要關注才能發訊息
-                if "Follow to message" in self.driver.page_source:
-                    logger.error(f"需要先關注 @{username} 才能發送訊息")
-                    return False
-                    
-                return False
+            result = self.resolve(SELECTOR_LADDERS['inbox_result'], WAIT_CONFIG['selector_wait'],
+                                  params={'username': username})
+            result.click()
             
-            # 等待訊息輸入框出現 (使用更可靠的選擇器)
-            message_box_selector = "//div[@role='textbox']"
-            WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located((By.XPATH, message_box_selector))
+            self.resolve(SELECTOR_LADDERS['inbox_chat']).click()
+            return True
+        except InvalidSessionIdException:
+            # 瀏覽器會話已中斷，改走個人頁面也不會成功，交由 send_direct_message 重啟瀏覽器
+            raise
+        except WebDriverException as e:
+            # 逾時、元素過期或點擊被遮擋：改走個人頁面
+            logger.warning(f"收件匣路徑失敗 (@{username}): {e.msg}")
+            return False
+    
+    def type_and_send(self, username, message):
+        """在已開啟的對話視窗輸入並送出訊息"""
+        # 等待訊息輸入框出現 (使用更可靠的選擇器)
+        message_box_selector = "//div[@role='textbox']"
+        with PHASE_SECONDS.time(phase='composer_wait'):
+            message_input = self.wait_until(
+                EC.element_to_be_clickable((By.XPATH, message_box_selector))
             )
-            
-            # 輸入訊息
-            message_input = self.driver.find_element(By.XPATH, message_box_selector)
+        
+        # 輸入訊息
+        with PHASE_SECONDS.time(phase='typing'):
             message_input.click()  # 確保焦點
-            time.sleep(0.5)
-            message_input.send_keys(message)
-            
-            time.sleep(1)
-            
+            self.wait_until(element_focused(message_input))
+            self.enter_text(message_input, message)
+        
+        with PHASE_SECONDS.time(phase='send_confirmation'):
             # 點擊發送按鈕
-            send_selectors = [
-                "//button[text()='Send']",
-                "//button[text()='傳送']",
-                "//button[contains(@type, 'submit')]"
-            ]
-            
-            send_button_found = False
-            for selector in send_selectors:
-                try:
-                    send_button = self.driver.find_element(By.XPATH, selector)
-                    send_button.click()
-                    send_button_found = True
-                    break
-                except NoSuchElementException:
-                    continue
-            
-            if not send_button_found:
+            try:
+                send_button = self.resolve(SELECTOR_LADDERS['send_button'])
+            except TimeoutException:
                 logger.error("❌ 找不到發送按鈕")
-                return False
-            
-            # 等待發送完成
-            time.sleep(3)
-            
-            logger.info(f"✅ 成功發送 DM 給 @{username}")
-            return True
+                return self.fail(FAILURE_SEND_BUTTON_NOT_FOUND)
+            send_button.click()
+            self.send_clicked = True
             
+            # 等待發送完成：輸入框清空且訊息出現在對話中
+            try:
+                self.wait_until(message_sent(message_box_selector, message))
+            except TimeoutException:
+                logger.warning(f"⚠️ 無法確認訊息已顯示於對話中 (@{username})")
+        
+        logger.info(f"✅ 成功發送 DM 給 @{username}")
+        return True
+    
+    def enter_text(self, element, text):
+        """
+        在已取得焦點的輸入框輸入文字
+        insert_text 模式以單一 CDP 指令插入整段文字（長訊息不必逐字傳送，BMP 以外的 emoji 也不會出錯），
+        確認內容與訊息完全相同；插入失敗或內容不完整時清空輸入框改用 send_keys
+        """
+        if INPUT_CONFIG['mode'] == 'insert_text':
+            try:
+                self.driver.execute_cdp_cmd('Input.insertText', {'text': text})
+                self.wait_until(textbox_contains(element, text, exact=True), INPUT_CONFIG['verify_timeout'])
+                return
+            except TimeoutException:
+                logger.warning("⚠️ insertText 插入的內容與訊息不一致，改用 send_keys")
+            except Exception as e:
+                logger.warning(f"⚠️ 無法使用 insertText，改用 send_keys: {str(e)}")
+            element.send_keys(Keys.CONTROL, 'a')
+            element.send_keys(Keys.DELETE)
+        
+        element.send_keys(text)
+        self.wait_until(textbox_contains(element, text))
+    
+    def apply_resource_blocking(self):
+        """透過 CDP 封鎖圖片、影音、字型與第三方追蹤資源，保留 DM 流程所需的 JavaScript"""
+        if not RESOURCE_BLOCKING['enabled']:
+            return
+        try:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': RESOURCE_BLOCKING['patterns']})
+            logger.info(f"🚫 已啟用資源封鎖 ({len(RESOURCE_BLOCKING['patterns'])} 個規則)")
         except Exception as e:
-            logger.error(f"❌ 發送 DM 給 @{username} 失敗: {str(e)}")
+            logger.warning(f"無法啟用資源封鎖: {str(e)}")
+    
+    def navigate(self, url):
+        """前往指定頁面並記錄導覽次數（供瀏覽器回收策略使用）與傳輸量、就緒時間"""
+        self.navigations += 1
+        self.last_activity = time.time()
+        start = time.time()
+        self.driver.get(url)
+        elapsed_ms = int((time.time() - start) * 1000)
+        
+        try:
+            stats = self.driver.execute_script(NAVIGATION_STATS_SCRIPT) or {}
+        except Exception:
+            stats = {}
+        stats['navigate_ms'] = elapsed_ms
+        self.last_navigation = stats
+        
+        if stats.get('transfer_bytes') is not None:
+            logger.info(
+                f"📄 {url} 傳輸 {stats['transfer_bytes'] / 1024:.0f} KB / {stats['resources']} 個資源，"
+                f"DOMContentLoaded {stats['dom_ready_ms']} ms，載入 {elapsed_ms} ms"
+            )
+    
+    def browser_memory_mb(self):
+        """chromedriver 與所有 Chrome 子行程的 RSS 總和（MB），無法取得時回傳 None"""
+        try:
+            return process_tree_rss_mb(self.driver.service.process.pid)
+        except Exception:
+            return None
+    
+    def recycle_reason(self):
+        """依回收策略判斷是否需要重啟瀏覽器，回傳原因或 None"""
+        if not self.driver:
+            return None
+        
+        if RECYCLE_CONFIG['max_navigations'] and self.navigations >= RECYCLE_CONFIG['max_navigations']:
+            return f"已導覽 {self.navigations} 次"
+        
+        if RECYCLE_CONFIG['max_rss_mb']:
+            memory = self.browser_memory_mb()
+            if memory is not None and memory >= RECYCLE_CONFIG['max_rss_mb']:
+                return f"瀏覽器記憶體 {memory} MB"
+        
+        if RECYCLE_CONFIG['idle_timeout']:
+            idle = time.time() - self.last_activity
+            if idle >= RECYCLE_CONFIG['idle_timeout']:
+                return f"閒置 {int(idle)} 秒"
+        
+        return None
+    
+    def maybe_recycle(self):
+        """符合回收條件時保存會話並關閉瀏覽器，下次使用時會重新啟動並還原會話"""
+        reason = self.recycle_reason()
+        if not reason:
             return False
+        
+        logger.info(f"♻️ 回收瀏覽器（{reason}）")
+        if self.is_logged_in:
+            self.save_session()
+        self.close()
+        self.recycles += 1
+        return True
     
     def close(self):
         """關閉瀏覽器"""
@@ -322,41 +812,311 @@ class InstagramBot:
                 logger.info("瀏覽器已關閉")
             except:
                 pass
+        self.driver = None
+        self.is_logged_in = False
 
 # 全域 Bot 實例
 bot = InstagramBot()
+# 所有瀏覽器操作（初始化、發送、回收）都在同一個工作執行緒依序執行，發送計數器也只在該執行緒內更新
+browser = BrowserWorker()
+prepare_flight = SingleFlight()
+warmup_state = {
+    'state': 'idle',
+    'error': None,
+    'started_at': None,
+    'duration': None
+}
+
+def prepare_bot():
+    """確保 Bot 已初始化和登入，回傳 (是否就緒, 錯誤訊息)"""
+    # 預熱、會話監控與任務執行緒可能同時呼叫：同一時間只會有一次初始化 / 重新登入，其餘呼叫者共用其結果
+    if browser.in_worker():
+        # 已在瀏覽器工作執行緒內：其他執行緒發起的初始化排在目前工作之後，等待其結果會互相卡住，直接執行
+        return _prepare_bot()
+    return prepare_flight.run(browser.run, _prepare_bot)
+
+def _prepare_bot():
+    """在瀏覽器工作執行緒內執行的初始化"""
+    bot.maybe_recycle()
+    
+    # 發送前以 cookie（必要時加上 fetch）確認會話仍有效，不必等到開啟個人頁面被導向登入頁才發現
+    if bot.driver and bot.is_logged_in:
+        try:
+            valid = bot.check_session()
+        except Exception as e:
+            # 瀏覽器沒有回應：關閉後重新啟動並還原保存的會話
+            logger.warning(f"登入會話檢查失敗，重新啟動瀏覽器: {str(e)}")
+            bot.close()
+        else:
+            if not valid:
+                bot.is_logged_in = False
+                bot.session_store.clear()
+    
+    if not bot.driver:
+        logger.info("初始化 Instagram Bot...")
+        if not bot.setup_driver():
+            return False, '無法初始化瀏覽器'
+    
+    if not bot.is_logged_in and not bot.restore_session():
+        logger.info("登入 Instagram...")
+        if not bot.login():
+            return False, '無法登入 Instagram'
+    
+    return True, None
+
+def warm_up_bot():
+    """背景預熱：啟動瀏覽器並登入，讓第一個請求不必等待"""
+    warmup_state.update(state='warming', error=None, started_at=datetime.now().isoformat())
+    start = time.time()
+    logger.info("🔥 預熱瀏覽器與登入會話...")
+    
+    try:
+        ready, error = prepare_bot()
+    except Exception as e:
+        ready, error = False, str(e)
+    
+    warmup_state.update(
+        state='ready' if ready else 'failed',
+        error=error,
+        duration=round(time.time() - start, 2)
+    )
+    if ready:
+        logger.info(f"✅ 預熱完成，耗時 {warmup_state['duration']} 秒")
+    else:
+        logger.error(f"❌ 預熱失敗: {error}")
+
+def recycle_monitor():
+    """背景檢查閒置與記憶體條件，不需等到下一次發送才回收"""
+    while True:
+        time.sleep(60)
+        try:
+            browser.run(bot.maybe_recycle)
+        except Exception as e:
+            logger.warning(f"瀏覽器回收檢查失敗: {str(e)}")
+
+def session_monitor():
+    """背景定期確認登入會話，失效時在閒置期間重新登入，不必等到下一次發送"""
+    while True:
+        time.sleep(SESSION_CONFIG['verify_interval'])
+        if not bot.driver or not bot.is_logged_in:
+            continue
+        try:
+            prepare_bot()
+        except Exception as e:
+            logger.warning(f"登入會話檢查失敗: {str(e)}")
 
-def check_rate_limits():
-    """檢查發送限制"""
-    global daily_sent_count, hourly_sent_count, last_reset_hour, last_sent_time
+def start_session_monitor():
+    """SESSION_VERIFY_SECONDS 大於 0 時啟動背景會話監控"""
+    if SESSION_CONFIG['verify_interval'] > 0:
+        threading.Thread(target=session_monitor, name='session-monitor', daemon=True).start()
+
+def start_recycle_monitor():
+    """啟用閒置或記憶體回收條件時啟動背景監控"""
+    if RECYCLE_CONFIG['idle_timeout'] or RECYCLE_CONFIG['max_rss_mb']:
+        threading.Thread(target=recycle_monitor, name='browser-recycle-monitor', daemon=True).start()
+
+def start_warm_up():
+    """EAGER_START 啟用時，在服務啟動時於背景執行預熱"""
+    if not STARTUP_CONFIG['eager_start']:
+        return
+    threading.Thread(target=warm_up_bot, name='bot-warmup', daemon=True).start()
+
+def process_dm_item(dm_item):
+    """
+    處理單筆 DM，回傳該列的發送結果（發送限制由 rate_limit_wait() 在處理前把關）
+    暫時性失敗與會話失效以指數退避重試，最多 RETRY_CONFIG['max_retries'] 次；失敗的嘗試不計入發送額度
+    """
+    # 收件人狀態快取未命中：需要實際開啟頁面（命中次數由 find_known_result() 記錄）
+    RECIPIENT_CACHE_LOOKUPS.inc(result='miss')
     
-    current_hour = datetime.now().hour
-    current_time = time.time()
+    start = time.monotonic()
+    retries = 0
+    while True:
+        result = browser.run(send_dm_item, dm_item)
+        reason = result['reason']
+        if reason == FAILURE_BROWSER_UNAVAILABLE:
+            # 瀏覽器無法啟動或登入時其餘項目也無法發送，直接結束整個任務
+            MESSAGES_TOTAL.inc(result='failure', reason=reason)
+            raise JobAborted(result['error'], result)
+        if result['success'] or not is_retryable(reason) or retries >= RETRY_CONFIG['max_retries']:
+            break
+        
+        # 重試前的等待在任務執行緒進行，不佔用瀏覽器工作執行緒
+        wait = RETRY_CONFIG['backoff'] * (2 ** retries)
+        retries += 1
+        SEND_RETRIES.inc(reason=reason)
+        logger.warning(f"⚠️ 發送給 @{dm_item['igUsername']} 失敗（{reason}，{failure_class(reason)}），"
+                       f"{wait:.1f} 秒後重試 ({retries}/{RETRY_CONFIG['max_retries']})")
+        time.sleep(wait)
     
-    # 重置小時計數器
-    if current_hour != last_reset_hour:
-        hourly_sent_count = 0
-        last_reset_hour = current_hour
+    result['retries'] = retries
+    result['duration'] = round(time.monotonic() - start, 2)
+    MESSAGES_TOTAL.inc(result='success' if result['success'] else 'failure', reason=reason or 'none')
     
-    # 檢查限制
-    if daily_sent_count >= RATE_LIMITS['daily_limit']:
-        return False, "已達每日發送限制"
+    # 發送後的隨機間隔由 rate_limiter 決定，任務佇列在處理下一筆前等待，結果立即回報
+    return result
+
+def rate_limit_wait():
+    """任務佇列每筆發送前呼叫：回傳 (需等待秒數, 原因)，達到限制的項目會延後到最早可發送的時間點"""
+    wait, limit = rate_limiter.check()
+    if not limit:
+        return 0, None
+    RATE_LIMIT_WAITS.inc(reason=limit)
+    return wait, LIMIT_MESSAGES[limit]
+
+def estimate_schedule(count):
+    """預估接下來 count 筆的發送時間（秒）：每筆間隔取隨機等待的平均值加上實際發送耗時"""
+    pace = (RATE_LIMITS['min_interval'] + RATE_LIMITS['max_interval']) / 2
+    pace += PHASE_SECONDS.mean(phase='message_total') or 0
+    return rate_limiter.schedule(count, pace)
+
+def find_known_result(dm_item):
+    """發送前查詢已發送索引與收件人狀態快取，結果已知的項目不需開啟瀏覽器"""
+    return find_known_results([dm_item])[0]
+
+def find_known_results(dm_list):
+    """建立任務時一次查詢整批：已發送索引與收件人狀態快取各只開一次連線"""
+    duplicates = dedup_index.lookup_many(dm_list)
+    remaining = [dm_item for dm_item, duplicate in zip(dm_list, duplicates) if duplicate is None]
+    cached = iter(recipient_cache.get_many([dm_item['igUsername'] for dm_item in remaining]))
     
-    if hourly_sent_count >= RATE_LIMITS['hourly_limit']:
-        return False, "已達每小時發送限制"
+    results = []
+    for dm_item, duplicate in zip(dm_list, duplicates):
+        if duplicate is not None:
+            DUPLICATES_TOTAL.inc()
+            results.append(duplicate)
+        else:
+            results.append(cached_result(dm_item, next(cached)))
+    return results
+
+def cached_result(dm_item, cached):
+    """收件人狀態快取命中時的結果，未命中時回傳 None"""
+    if cached is None:
+        return None
     
-    if current_time - last_sent_time < RATE_LIMITS['min_interval']:
-        return False, "發送間隔太短"
+    RECIPIENT_CACHE_LOOKUPS.inc(result='hit')
     
-    return True, "可以發送"
+    logger.info(f"@{dm_item['igUsername']} 於 {cached['checked_at']} 確認為 {cached['status']}，不重新開啟個人頁面")
+    MESSAGES_TOTAL.inc(result='failure', reason=cached['status'])
+    return {
+        'rowIndex': dm_item['rowIndex'],
+        'igUsername': dm_item['igUsername'],
+        'success': False,
+        'error': failure_message(cached['status']),
+        'reason': cached['status'],
+        'cached': True
+    }
+
+def recipient_cache_hit_ratio():
+    hits = RECIPIENT_CACHE_LOOKUPS.value(result='hit')
+    total = hits + RECIPIENT_CACHE_LOOKUPS.value(result='miss')
+    return round(hits / total, 4) if total else None
+
+def forward_job_event(job_id, event, data):
+    """將任務事件轉給結果回呼（只處理建立時帶有 callback_url 的任務）"""
+    url = job_queue.callback_url(job_id)
+    if not url:
+        return
+    if event == 'result':
+        callback_notifier.add(job_id, url, data)
+    elif event == 'finished':
+        callback_notifier.finish(job_id, url, data['status'], data['error'], job_queue.get_job(job_id)['summary'])
 
-def update_rate_limit_counters():
-    """更新發送計數器"""
-    global daily_sent_count, hourly_sent_count, last_sent_time
+def create_sheet_writer():
+    """依 SHEETS_WRITEBACK 建立試算表回寫，停用時回傳 None"""
+    mode = SHEETS_CONFIG['writeback']
+    if mode == 'gspread':
+        sink = GspreadSink(SHEETS_CONFIG['credentials_file'], SHEETS_CONFIG['sheet_id'],
+                           SHEETS_CONFIG['worksheet'] or None, SHEETS_CONFIG['start_column'])
+    elif mode == 'memory':
+        sink = MemorySink()
+    else:
+        return None
+    logger.info(f"📝 啟用試算表回寫 ({mode})")
+    return SheetWriter(sink, SHEETS_CONFIG['batch_size'], SHEETS_CONFIG['flush_interval'])
+
+def write_back_job_event(job_id, event, data):
+    """將每一列的結果交給試算表回寫，任務結束時立即寫入剩餘結果（由回寫執行緒呼叫 API，不阻塞發送）"""
+    if event == 'result':
+        sheet_writer.add(data)
+    elif event == 'finished':
+        sheet_writer.request_flush()
+
+def send_dm_item(dm_item):
+    """在瀏覽器工作執行緒內嘗試發送一次並記錄發送紀錄，失敗時 reason 為失敗原因"""
+    # 發送 DM（瀏覽器可能在批次中被回收，發送前重新確認已就緒）
+    ready, error = prepare_bot()
+    if not ready:
+        return {
+            'rowIndex': dm_item['rowIndex'],
+            'igUsername': dm_item['igUsername'],
+            'success': False,
+            'error': error,
+            'reason': FAILURE_BROWSER_UNAVAILABLE
+        }
     
-    daily_sent_count += 1
-    hourly_sent_count += 1
-    last_sent_time = time.time()
+    success = bot.send_direct_message(
+        dm_item['igUsername'], 
+        dm_item['dmContent']
+    )
+    
+    reason = None if success else bot.failure_reason or FAILURE_ERROR
+    result = {
+        'rowIndex': dm_item['rowIndex'],
+        'igUsername': dm_item['igUsername'],
+        'success': success,
+        'error': None if success else failure_message(reason),
+        'reason': reason
+    }
+    if success:
+        rate_limiter.record()
+        dedup_index.record(dm_item, result)
+        recipient_cache.forget(dm_item['igUsername'])
+    elif reason in RECIPIENT_CACHE_TTLS:
+        recipient_cache.record(dm_item['igUsername'], reason)
+    
+    return result
+
+# 已發送索引與全域任務佇列（持久化於 SQLite，重啟後自動接續未完成的任務）
+dedup_index = DedupIndex(STORAGE_CONFIG['db_path'], ttl=DEDUP_CONFIG['ttl_days'] * 86400)
+recipient_cache = RecipientCache(STORAGE_CONFIG['db_path'], RECIPIENT_CACHE_TTLS)
+sheet_writer = create_sheet_writer()
+job_queue = JobQueue(process_dm_item, prepare=prepare_bot, db_path=STORAGE_CONFIG['db_path'],
+                     throttle=rate_limit_wait, schedule=estimate_schedule, lookup=find_known_result,
+                     lookup_many=find_known_results)
+callback_notifier = CallbackNotifier(store=job_queue, **CALLBACK_CONFIG)
+job_queue.subscribe(forward_job_event)
+if sheet_writer:
+    job_queue.subscribe(write_back_job_event)
+job_stream = JobStream(job_queue, heartbeat=STREAM_CONFIG['heartbeat'])
+# 發送限制（滾動視窗，發送紀錄與任務佇列存於同一個資料庫）
+rate_limiter = RateLimiter(
+    RATE_LIMITS['daily_limit'],
+    RATE_LIMITS['hourly_limit'],
+    RATE_LIMITS['min_interval'],
+    RATE_LIMITS['max_interval'],
+    store=job_queue
+)
+job_queue.start()
+start_warm_up()
+start_recycle_monitor()
+start_session_monitor()
+
+# 輸出 /metrics 時才讀取的即時數值
+REGISTRY.gauge('igbot_daily_sent', '過去 24 小時已發送數', lambda: rate_limiter.counts()['daily'])
+REGISTRY.gauge('igbot_hourly_sent', '過去一小時已發送數', lambda: rate_limiter.counts()['hourly'])
+REGISTRY.gauge('igbot_next_send_seconds', '距離下一次允許發送的秒數', lambda: round(rate_limiter.check()[0], 1))
+REGISTRY.gauge('igbot_logged_in', '是否已登入（1 / 0）', lambda: int(bot.is_logged_in))
+REGISTRY.gauge('igbot_browser_navigations', '目前瀏覽器的導覽次數', lambda: bot.navigations)
+REGISTRY.gauge('igbot_browser_recycles', '瀏覽器回收次數', lambda: bot.recycles)
+REGISTRY.gauge('igbot_browser_memory_mb', '瀏覽器行程樹 RSS（MB）', lambda: bot.browser_memory_mb() if bot.driver else None)
+REGISTRY.gauge('igbot_pending_rows', '佇列中待發送的項目數', job_queue.pending_rows)
+REGISTRY.gauge('igbot_recipient_cache_hit_ratio', '收件人狀態快取命中率', lambda: recipient_cache_hit_ratio())
+REGISTRY.gauge('igbot_callback_batches_delivered', '已送出的結果回呼批次數', lambda: callback_notifier.stats['delivered'])
+REGISTRY.gauge('igbot_callback_batches_failed', '重試後仍送出失敗的結果回呼批次數', lambda: callback_notifier.stats['failed'])
+REGISTRY.gauge('igbot_sheet_writes', '試算表批次寫入次數', lambda: sheet_writer.stats['writes'] if sheet_writer else None)
+REGISTRY.gauge('igbot_sheet_rows_written', '已回寫到試算表的列數', lambda: sheet_writer.stats['rows'] if sheet_writer else None)
+REGISTRY.gauge('igbot_browser_queue_depth', '等待瀏覽器工作執行緒處理的工作數', browser.pending)
 
 @app.route('/', methods=['GET'])
 def home():
@@ -372,9 +1132,10 @@ def home():
 def health_check():
     """健康檢查端點"""
     return jsonify({
-        'status': 'healthy',
+        'status': 'warming' if warmup_state['state'] == 'warming' else 'healthy',
         'bot_initialized': bot.driver is not None,
         'logged_in': bot.is_logged_in,
+        'warmup': warmup_state,
         'timestamp': datetime.now().isoformat()
     })
 
@@ -403,7 +1164,7 @@ def test_connection():
 
 @app.route('/send_dms', methods=['POST'])
 def send_dms():
-    """發送 DM 端點"""
+    """發送 DM 端點 - 建立背景任務並立即回傳 job_id"""
     try:
         data = request.json
         if not data or 'data' not in data:
@@ -412,89 +1173,72 @@ def send_dms():
                 'error': '無效的請求資料'
             }), 400
         
-        dm_list = data['data']
-        logger.info(f"收到 DM 發送請求，共 {len(dm_list)} 個項目")
-        
-        results = []
-        
-        # 確保 Bot 已初始化和登入
-        if not bot.driver:
-            logger.info("初始化 Instagram Bot...")
-            if not bot.setup_driver():
-                return jsonify({
-                    'success': False,
-                    'error': '無法初始化瀏覽器'
-                }), 500
-        
-        if not bot.is_logged_in:
-            logger.info("登入 Instagram...")
-            if not bot.login():
-                return jsonify({
-                    'success': False,
-                    'error': '無法登入 Instagram'
-                }), 500
-        
-        # 處理每個 DM
-        for dm_item in dm_list:
-            try:
-                # 檢查發送限制
-                can_send, limit_message = check_rate_limits()
-                if not can_send:
-                    logger.warning(f"跳過 @{dm_item['igUsername']}: {limit_message}")
-                    results.append({
-                        'rowIndex': dm_item['rowIndex'],
-                        'igUsername': dm_item['igUsername'],
-                        'success': False,
-                        'error': limit_message
-                    })
-                    continue
-                
-                # 發送 DM
-                success = bot.send_direct_message(
-                    dm_item['igUsername'], 
-                    dm_item['dmContent']
-                )
-                
-                if success:
-                    update_rate_limit_counters()
-                    
-                results.append({
-                    'rowIndex': dm_item['rowIndex'],
-                    'igUsername': dm_item['igUsername'],
-                    'success': success,
-                    'error': None if success else '發送失敗'
-                })
-                
-                # 隨機等待避免被偵測
-                if success:
-                    wait_time = random.randint(RATE_LIMITS['min_interval'], RATE_LIMITS['max_interval'])
-                    logger.info(f"等待 {wait_time} 秒...")
-                    time.sleep(wait_time)
-                
-            except Exception as e:
-                logger.error(f"處理 @{dm_item['igUsername']} 時發生錯誤: {str(e)}")
-                results.append({
-                    'rowIndex': dm_item['rowIndex'],
-                    'igUsername': dm_item['igUsername'],
-                    'success': False,
-                    'error': str(e)
-                })
+        # 開啟瀏覽器之前先驗證並正規化所有資料列，無效的資料列不會進入排程
+        try:
+            items, invalid = validate_dm_list(data['data'])
+        except ValidationError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        logger.info(f"收到 DM 發送請求，共 {len(items)} 個項目" + (f"（{len(invalid)} 個資料格式錯誤）" if invalid else ''))
         
-        # 統計結果
-        success_count = sum(1 for r in results if r['success'])
-        total_count = len(results)
+        # 空的批次照常建立（立即完成的）任務；只有每一列都無效時才拒絕
+        if invalid and len(invalid) == len(items):
+            return jsonify({
+                'success': False,
+                'error': '沒有可發送的資料列',
+                'invalid': invalid
+            }), 400
+        
+        callback_url = data.get('callback_url')
+        if callback_url and not str(callback_url).startswith(('http://', 'https://')):
+            return jsonify({
+                'success': False,
+                'error': 'callback_url 必須是 http:// 或 https:// 網址'
+            }), 400
         
-        logger.info(f"DM 發送完成: {success_count}/{total_count} 成功")
+        # 請求層級的 idempotency_key 搭配 rowIndex 作為每一列的 idempotencyKey
+        if data.get('idempotency_key'):
+            for dm_item in items:
+                if dm_item is not None:
+                    dm_item.setdefault('idempotencyKey', f"{data['idempotency_key']}:{dm_item['rowIndex']}")
         
+        # 無效的資料列以失敗結果記錄在任務中，結果回呼與試算表回寫也會收到
+        known = [None] * len(items)
+        dm_list = list(items)
+        for error in invalid:
+            MESSAGES_TOTAL.inc(result='failure', reason=FAILURE_INVALID)
+            known[error['index']] = {
+                'rowIndex': error['rowIndex'],
+                'igUsername': error['igUsername'],
+                'success': False,
+                'error': error['error'],
+                'reason': FAILURE_INVALID,
+                'invalid': True
+            }
+            dm_list[error['index']] = {
+                'rowIndex': error['rowIndex'],
+                'igUsername': error['igUsername'] if isinstance(error['igUsername'], str) else None
+            }
+        
+        job_id = job_queue.submit(dm_list, callback_url=callback_url, known=known)
+        job = job_queue.get_job(job_id)
+        
+        # 超過發送限制的項目不會失敗，而是排到最早可發送的時間，eta 為預估的發送時間
         return jsonify({
             'success': True,
-            'results': results,
-            'summary': {
-                'total': total_count,
-                'success': success_count,
-                'failed': total_count - success_count
-            }
-        }), 200
+            'job_id': job_id,
+            'status': JOB_QUEUED,
+            'total': len(dm_list),
+            'eta': job['eta'],
+            'duplicates': sum(1 for result in job['results'] if result.get('duplicate')),
+            'invalid': invalid,
+            'rows': [{'rowIndex': row['rowIndex'], 'igUsername': row['igUsername'], 'state': row['state'], 'eta': row['eta']}
+                     for row in job['rows']],
+            'status_url': f"/jobs/{job_id}",
+            'stream_url': f"/jobs/{job_id}/stream"
+        }), 202
         
     except Exception as e:
         logger.error(f"發送 DM 時發生錯誤: {str(e)}")
@@ -503,16 +1247,69 @@ def send_dms():
             'error': str(e)
         }), 500
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """查詢 DM 任務進度與結果"""
+    job = job_queue.get_job(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': '找不到指定的任務'
+        }), 404
+    
+    job['success'] = True
+    return jsonify(job), 200
+
+@app.route('/jobs/<job_id>/stream', methods=['GET'])
+def stream_job(job_id):
+    """串流 DM 任務進度：預設為 NDJSON，Accept: text/event-stream 或 ?format=sse 時為 Server-Sent Events"""
+    records = job_stream.records(job_id)
+    if records is None:
+        return jsonify({
+            'success': False,
+            'error': '找不到指定的任務'
+        }), 404
+    
+    if request.args.get('format') == 'sse' or request.accept_mimetypes.best == 'text/event-stream':
+        body, mimetype = server_sent_events(records), 'text/event-stream'
+    else:
+        body, mimetype = ndjson(records), 'application/x-ndjson'
+    # 關閉反向代理的緩衝，讓每一筆記錄立即送到呼叫端
+    return Response(body, mimetype=mimetype, headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/selectors', methods=['GET'])
+def get_selector_stats():
+    """取得各選擇器階梯的嘗試順序與命中統計"""
+    return jsonify({
+        'success': True,
+        'ladders': [ladder.snapshot() for ladder in SELECTOR_LADDERS.values()],
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus 格式的效能指標"""
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/status', methods=['GET'])
 def get_status():
     """取得 Bot 狀態"""
+    sent = rate_limiter.counts()
+    wait, limit = rate_limiter.check()
     return jsonify({
         'bot_initialized': bot.driver is not None,
         'logged_in': bot.is_logged_in,
-        'daily_sent': daily_sent_count,
-        'hourly_sent': hourly_sent_count,
+        'daily_sent': sent['daily'],
+        'hourly_sent': sent['hourly'],
+        'next_send_in': round(wait, 1),
+        'rate_limited_by': limit,
         'daily_limit': RATE_LIMITS['daily_limit'],
         'hourly_limit': RATE_LIMITS['hourly_limit'],
+        'browser_memory_mb': bot.browser_memory_mb() if bot.driver else None,
+        'browser_navigations': bot.navigations,
+        'browser_recycles': bot.recycles,
+        'active_jobs': job_queue.queued_count(),
+        'pending_rows': job_queue.pending_rows(),
         'environment': 'Zeabur',
         'instagram_username': INSTAGRAM_CONFIG['username'],
         'timestamp': datetime.now().isoformat()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+訊息輸入效能測試：send_keys vs CDP Input.insertText
+
+在真實的 headless Chrome 中開啟與 Instagram 對話框相同結構的 contenteditable 輸入框，
+以不同長度的中文訊息（含 emoji）比較兩種輸入方式的耗時，並確認輸入框內容與訊息完全相同。
+
+需要本機已安裝 Chrome 與 ChromeDriver。
+
+用法:
+    python benchmarks/bench_input.py [次數]
+"""
+
+import os
+import sys
+import time
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
+
+from waits import element_focused, textbox_contains
+
+LENGTHS = [20, 100, 300, 1000]
+
+COMPOSER_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"></head>
+<body>
+<div role="textbox" contenteditable="true" aria-label="Message" style="min-height:20px"></div>
+</body></html>
+"""
+
+# Apps Script 範本常見的內容：中文、標點與 emoji（含 BMP 以外的字元）
+SAMPLE = '您好！恭喜新開幕，我們是在地的行銷團隊，想和您聊聊合作的機會 🎉🙂 期待您的回覆。'
+
+
+def build_message(length):
+    return (SAMPLE * (length // len(SAMPLE) + 1))[:length]
+
+
+def start_driver():
+    options = Options()
+    options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-gpu')
+    return webdriver.Chrome(options=options)
+
+
+def open_composer(driver, page_path):
+    driver.get('file://' + page_path)
+    textbox = driver.find_element(By.XPATH, "//div[@role='textbox']")
+    textbox.click()
+    WebDriverWait(driver, 5).until(element_focused(textbox))
+    return textbox
+
+
+def type_send_keys(driver, textbox, message):
+    textbox.send_keys(message)
+
+
+def type_insert_text(driver, textbox, message):
+    driver.execute_cdp_cmd('Input.insertText', {'text': message})
+
+
+def measure(driver, page_path, method, message):
+    """回傳 (耗時秒數, 內容是否完全相同)；輸入時拋出例外（例如 BMP 以外的字元）時耗時為 None"""
+    textbox = open_composer(driver, page_path)
+    start = time.monotonic()
+    try:
+        method(driver, textbox, message)
+    except Exception:
+        return None, False
+    try:
+        WebDriverWait(driver, 10, poll_frequency=0.05).until(textbox_contains(textbox, message, exact=True))
+        exact = True
+    except Exception:
+        exact = False
+    elapsed = time.monotonic() - start
+    textbox.send_keys(Keys.CONTROL, 'a')
+    textbox.send_keys(Keys.DELETE)
+    return elapsed, exact
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    page_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.bench_input.html')
+    with open(page_path, 'w', encoding='utf-8') as f:
+        f.write(COMPOSER_PAGE)
+
+    driver = start_driver()
+    try:
+        print(f"執行次數: {runs}")
+        print(f"{'長度':>6}{'send_keys (ms)':>18}{'內容正確':>10}{'insertText (ms)':>18}{'內容正確':>10}")
+        for length in LENGTHS:
+            message = build_message(length)
+            row = []
+            for method in (type_send_keys, type_insert_text):
+                samples, exact = [], True
+                for _ in range(runs):
+                    elapsed, ok = measure(driver, page_path, method, message)
+                    exact = exact and ok
+                    if elapsed is not None:
+                        samples.append(elapsed)
+                mean_ms = f"{statistics.mean(samples) * 1000:.1f}" if samples else '失敗'
+                row.append((mean_ms, '✅' if exact else '❌'))
+            print(f"{length:>6}{row[0][0]:>18}{row[0][1]:>10}{row[1][0]:>18}{row[1][1]:>10}")
+    finally:
+        driver.quit()
+        os.remove(page_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+啟動效能測試
+以全新的 Python 行程量測 `import app` 的耗時，以及從啟動 `python app.py` 到 /health 第一次回應 200 的時間，
+並與啟動時即匯入 Selenium / requests 的舊行為（eager）比較。
+
+不需要 Chrome：服務啟動與 /health 都不會建立瀏覽器。
+
+用法:
+    python benchmarks/bench_startup.py [次數]
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import tempfile
+import statistics
+import subprocess
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 舊行為：服務啟動前先匯入瀏覽器引擎與 HTTP 客戶端
+EAGER_PRELUDE = 'import selenium.webdriver, selenium.webdriver.support.expected_conditions, requests; '
+
+IMPORT_SCRIPT = """
+import sys, time, json
+start = time.perf_counter()
+{prelude}import app
+print(json.dumps({{
+    'seconds': time.perf_counter() - start,
+    'selenium': 'selenium' in sys.modules,
+    'requests': 'requests' in sys.modules
+}}))
+"""
+
+SERVE_SCRIPT = "import runpy; {prelude}runpy.run_path('app.py', run_name='__main__')"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def bench_env(tmpdir):
+    env = dict(os.environ)
+    env.update(BOT_DB_PATH=os.path.join(tmpdir, 'bot.db'), EAGER_START='false',
+               SESSION_COOKIE_FILE=os.path.join(tmpdir, 'cookies.json'))
+    return env
+
+
+def measure_import(prelude):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        output = subprocess.run(
+            [sys.executable, '-c', IMPORT_SCRIPT.format(prelude=prelude)],
+            cwd=ROOT, env=bench_env(tmpdir), capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_first_response(prelude, timeout=30):
+    """從啟動行程到 /health 回應 200 的秒數"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = bench_env(tmpdir)
+        env['PORT'] = str(free_port())
+        url = f"http://127.0.0.1:{env['PORT']}/health"
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, '-c', SERVE_SCRIPT.format(prelude=prelude)], cwd=ROOT,
+                                   env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            while time.perf_counter() - start < timeout:
+                try:
+                    with urllib.request.urlopen(url, timeout=1) as response:
+                        if response.status == 200:
+                            return time.perf_counter() - start
+                except OSError:
+                    time.sleep(0.01)
+            raise RuntimeError(f"/health 在 {timeout} 秒內沒有回應")
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def summarize(samples):
+    return f"mean {statistics.mean(samples) * 1000:7.0f}ms  min {min(samples) * 1000:7.0f}ms"
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"執行次數: {runs}")
+    for label, prelude in (('eager', EAGER_PRELUDE), ('lazy', '')):
+        imports = [measure_import(prelude) for _ in range(runs)]
+        first_response = [measure_first_response(prelude) for _ in range(runs)]
+        print(f"{label}:")
+        print(f"  import app        {summarize([sample['seconds'] for sample in imports])}"
+              f"  (selenium 已載入: {imports[-1]['selenium']}, requests 已載入: {imports[-1]['requests']})")
+        print(f"  首次 /health 回應  {summarize(first_response)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+等待策略效能測試：固定 time.sleep() vs 依頁面狀態等待
+
+以模擬的 WebDriver 重現 Instagram 頁面的時間軸（登入跳轉、輸入框出現、訊息泡泡出現），
+分別執行舊版固定等待的流程與 InstagramBot 目前的 login() / send_direct_message()，比較每則訊息的實際耗時。
+send 另外列出 SEND_PATH=inbox（從 /direct/new/ 直接開啟對話）的耗時。
+
+用法:
+    python benchmarks/bench_waits.py [次數]
+"""
+
+import os
+import sys
+import time
+import logging
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BOT_DB_PATH', os.path.join('data', 'bench_waits.db'))
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+
+import app
+
+# 模擬的 WebDriver 不經過 setup_driver()，直接載入 app 延遲匯入的 Selenium
+app.load_selenium()
+
+# 模擬頁面的時間軸（秒）
+PAGE_TIMING = {
+    'login_redirect': 2.5,    # 按下登入到離開登入頁
+    'network_settle': 0.8,    # 導覽後網路請求停止增加
+    'profile_main': 1.0,      # 個人頁面 <main> 出現
+    'composer_open': 1.2,     # 點擊 Message 到輸入框出現
+    'inbox_open': 0.6,        # /direct/new/ 搜尋框出現
+    'search_results': 0.7,    # 輸入帳號到搜尋結果出現
+    'message_bubble': 0.6,    # 按下傳送到訊息出現在對話中
+}
+
+
+class FakeElement(object):
+    def __init__(self, page, name):
+        self.page = page
+        self.name = name
+        self.stale = False
+        self.tag_name = 'div'
+        self.text = ''
+
+    def click(self):
+        self._check()
+        self.page.on_click(self)
+
+    def clear(self):
+        self._check()
+
+    def send_keys(self, text):
+        self._check()
+        if self.name == 'textbox':
+            self.page.textbox_value += text
+        elif self.name == 'search':
+            self.page._at('results', PAGE_TIMING['search_results'])
+
+    def is_displayed(self):
+        self._check()
+        return True
+
+    def is_enabled(self):
+        self._check()
+        return True
+
+    def get_attribute(self, name):
+        return None
+
+    def _check(self):
+        if self.stale:
+            raise StaleElementReferenceException(self.name)
+
+
+class FakeDriver(object):
+    """依時間軸回應 selenium 呼叫的模擬瀏覽器"""
+
+    def __init__(self):
+        self.url = 'about:blank'
+        self.page_source = ''
+        self.textbox_value = ''
+        self.sent_text = ''
+        self.events = {}
+        self.elements = {}
+
+    def _at(self, event, delay):
+        self.events[event] = time.monotonic() + delay
+
+    def _happened(self, event):
+        return event in self.events and time.monotonic() >= self.events[event]
+
+    def implicitly_wait(self, seconds):
+        pass
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    @property
+    def current_url(self):
+        if '/accounts/login' in self.url and self._happened('redirect'):
+            return app.INSTAGRAM_CONFIG['base_url'] + '/'
+        return self.url
+
+    def get(self, url):
+        self.url = url
+        self.events = {}
+        self.elements = {}
+        self.textbox_value = ''
+        self._at('loaded', 0)
+        self._at('idle', PAGE_TIMING['network_settle'])
+        if '/direct/new/' in url:
+            self._at('inbox', PAGE_TIMING['inbox_open'])
+        elif '/accounts/login' not in url:
+            self._at('main', PAGE_TIMING['profile_main'])
+
+    def on_click(self, element):
+        if element.name == 'login':
+            self._at('redirect', PAGE_TIMING['login_redirect'])
+            self._at('idle', PAGE_TIMING['login_redirect'] + PAGE_TIMING['network_settle'])
+        elif element.name in ('message_button', 'chat'):
+            self._at('composer', PAGE_TIMING['composer_open'])
+        elif element.name == 'result':
+            self._at('selected', 0)
+        elif element.name == 'send':
+            self.sent_text = self.textbox_value
+            self.textbox_value = ''
+            self._at('bubble', PAGE_TIMING['message_bubble'])
+
+    def _visible(self, name):
+        on_login = '/accounts/login' in self.current_url
+        if name in ('username', 'password', 'login'):
+            return on_login
+        if name == 'main':
+            return self._happened('main')
+        if name == 'message_button':
+            return self._happened('main')
+        if name in ('textbox', 'send'):
+            return self._happened('composer')
+        if name == 'search':
+            return self._happened('inbox')
+        if name == 'result':
+            return self._happened('results')
+        if name == 'chat':
+            return self._happened('selected')
+        return False
+
+    def _element(self, name):
+        if name not in self.elements:
+            self.elements[name] = FakeElement(self, name)
+        return self.elements[name]
+
+    def _resolve(self, by, value):
+        if by == By.NAME and value in ('username', 'password'):
+            return value
+        if value in ("//input[@name='username']", "//input[@name='password']"):
+            return value.split("'")[1]
+        if by == By.TAG_NAME and value == 'main':
+            return 'main'
+        if value == "//button[@type='submit']":
+            return 'login'
+        if value == "//div[@role='textbox']":
+            return 'textbox'
+        if value in ("//button[text()='Send']", "//button[text()='傳送']"):
+            return 'send'
+        if value == "//div[text()='Message']":
+            return 'message_button'
+        if value == "//input[@name='queryBox']":
+            return 'search'
+        if "ancestor::div[@role='button']" in value:
+            return 'result'
+        if value.startswith("//div[@role='dialog']//div[@role='button' and (text()='Chat'"):
+            return 'chat'
+        return None
+
+    def find_element(self, by, value):
+        name = self._resolve(by, value)
+        if name and self._visible(name):
+            return self._element(name)
+        raise NoSuchElementException(value)
+
+    def find_elements(self, by, value):
+        try:
+            return [self.find_element(by, value)]
+        except NoSuchElementException:
+            return []
+
+    def execute_cdp_cmd(self, cmd, params):
+        if cmd == 'Input.insertText':
+            self.textbox_value += params['text']
+        return {}
+
+    def execute_script(self, script, *args):
+        if 'markers' in script:
+            if not self._happened('main'):
+                return {'status': 'loading'}
+            for i, xpath in enumerate(args[0]):
+                if self._resolve(By.XPATH, xpath) == 'message_button':
+                    return {'status': 'messageable', 'index': i, 'button': self._element('message_button')}
+            return {'status': 'unknown'}
+        if 'snapshotItem' in script:
+            for i, xpath in enumerate(args[0]):
+                name = self._resolve(By.XPATH, xpath)
+                if name and self._visible(name):
+                    return [i, self._element(name)]
+            return None
+        if 'readyState' in script:
+            idle = self._happened('idle')
+            return ['complete', 10 if idle else int(time.monotonic() * 100)]
+        if 'activeElement' in script:
+            return True
+        if 'XPathResult' in script:
+            return self._happened('bubble') and args[1] in ' '.join(self.sent_text.split())
+        if 'el.value' in script:
+            return self.textbox_value
+        return None
+
+
+def legacy_login(driver):
+    """舊版 login() 的固定等待流程"""
+    driver.get(app.INSTAGRAM_CONFIG['login_url'])
+    WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.NAME, "username")))
+    driver.find_element(By.NAME, "username").send_keys('user')
+    time.sleep(1)
+    driver.find_element(By.NAME, "password").send_keys('pass')
+    time.sleep(1)
+    driver.find_element(By.XPATH, "//button[@type='submit']").click()
+    time.sleep(8)
+    try:
+        WebDriverWait(driver, 5).until(
+            EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Not Now')]"))
+        ).click()
+        time.sleep(2)
+    except TimeoutException:
+        pass
+    return 'login' not in driver.current_url
+
+
+def legacy_send(driver, username, message):
+    """舊版 send_direct_message() 的固定等待流程（訊息按鈕由第一個選擇器命中）"""
+    driver.get(f"{app.INSTAGRAM_CONFIG['base_url']}/{username}/")
+    WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "main")))
+    WebDriverWait(driver, 3).until(
+        EC.element_to_be_clickable((By.XPATH, "//div[text()='Message']"))
+    ).click()
+    time.sleep(2)
+    WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.XPATH, "//div[@role='textbox']")))
+    message_input = driver.find_element(By.XPATH, "//div[@role='textbox']")
+    message_input.click()
+    time.sleep(0.5)
+    message_input.send_keys(message)
+    time.sleep(1)
+    driver.find_element(By.XPATH, "//button[text()='Send']").click()
+    time.sleep(3)
+    return True
+
+
+def current_login(driver):
+    bot = app.InstagramBot()
+    bot.driver = driver
+    return bot.login()
+
+
+def current_send(driver, username, message, path='profile'):
+    app.SEND_CONFIG['path'] = path
+    bot = app.InstagramBot()
+    bot.driver = driver
+    bot.is_logged_in = True
+    return bot.send_direct_message(username, message)
+
+
+def inbox_send(driver, username, message):
+    return current_send(driver, username, message, path='inbox')
+
+
+def measure(func, *args):
+    start = time.monotonic()
+    ok = func(*args)
+    return time.monotonic() - start, ok
+
+
+def report(label, samples):
+    print(f"  {label:<8} mean {statistics.mean(samples):6.2f}s  min {min(samples):6.2f}s  max {max(samples):6.2f}s")
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    logging.getLogger().setLevel(logging.WARNING)
+    message = '您好！恭喜新開幕，我們想和您聊聊合作的機會 🙂'
+
+    timings = {'login': {'before': [], 'after': []}, 'send': {'before': [], 'after': [], 'inbox': []}}
+    for _ in range(runs):
+        for label, login, send in (('before', legacy_login, legacy_send),
+                                   ('after', current_login, current_send),
+                                   ('inbox', None, inbox_send)):
+            driver = FakeDriver()
+            if login is None:
+                elapsed, ok = measure(send, driver, 'test_user', message)
+                assert ok, f"{label} send failed"
+                timings['send'][label].append(elapsed)
+                continue
+
+            elapsed, ok = measure(login, driver)
+            assert ok, f"{label} login failed"
+            timings['login'][label].append(elapsed)
+
+            elapsed, ok = measure(send, driver, 'test_user', message)
+            assert ok, f"{label} send failed"
+            timings['send'][label].append(elapsed)
+
+    print(f"模擬頁面時間軸: {PAGE_TIMING}")
+    print(f"執行次數: {runs}")
+    for phase in ('login', 'send'):
+        print(f"{phase}:")
+        for label, samples in timings[phase].items():
+            report(label, samples)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+本地 Instagram 模擬伺服器
+提供登入頁、個人頁面（一般 / 私人 / 不存在 / 需追蹤）、/direct/new/ 與對話頁，
+DOM 結構對應 app.py 中選擇器階梯與頁面分類所尋找的元素，可設定延遲與失敗注入
+
+個人頁面類型由帳號前綴決定:
+    private_*   私人帳號（This Account is Private）
+    missing_*   不存在（Sorry, this page isn't available.）
+    follow_*    需追蹤才能傳訊息（Follow to message）
+    其他        可傳訊息（Message 按鈕）
+
+用法:
+    python benchmarks/fake_instagram.py --port 8765 --latency 0.3 --failure-rate 0.05
+    INSTAGRAM_BASE_URL=http://127.0.0.1:8765 python app.py
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from html import escape
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SESSION_COOKIE = 'sessionid'
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+LOGIN_BODY = """
+<main>
+  <form method="post" action="/accounts/login/">
+    <input name="username" type="text" aria-label="Phone number, username, or email">
+    <input name="password" type="password">
+    <button type="submit">Log in</button>
+  </form>
+  {error}
+</main>
+"""
+
+HOME_BODY = """
+<nav>
+  <a href="/"><svg aria-label="Home" width="24" height="24"><rect width="24" height="24"></rect></svg></a>
+  <a href="/direct/inbox/">Messages</a>
+</nav>
+<main><h1>Home</h1></main>
+"""
+
+PROFILE_BODY = """
+<main>
+  <header>
+    <h2>{username}</h2>
+    {actions}
+  </header>
+  <section>{notice}</section>
+</main>
+"""
+
+MESSAGE_BUTTON = """<div role="button" tabindex="0" onclick="location.href='/direct/t/{username}/'">Message</div>"""
+FOLLOW_BUTTON = """<button type="button">Follow</button>"""
+
+NOT_FOUND_BODY = """
+<main>
+  <h2>Sorry, this page isn't available.</h2>
+  <p>The link you followed may be broken, or the page may have been removed.</p>
+</main>
+"""
+
+THREAD_BODY = """
+<main>
+  <h2>{username}</h2>
+  <div id="thread"></div>
+  <div role="textbox" contenteditable="true" aria-label="Message" style="min-height:20px;border:1px solid #ccc"></div>
+  <button type="button" onclick="sendMessage()">Send</button>
+</main>
+<script>
+function sendMessage() {{
+  var box = document.querySelector("[role='textbox']");
+  var text = box.innerText;
+  fetch('/api/send', {{
+    method: 'POST',
+    headers: {{'Content-Type': 'application/json'}},
+    body: JSON.stringify({{username: {username_json}, text: text}})
+  }}).then(function (response) {{
+    if (!response.ok) return;
+    var bubble = document.createElement('div');
+    bubble.className = 'bubble';
+    bubble.innerText = text;
+    document.getElementById('thread').appendChild(bubble);
+  }});
+  box.innerText = '';
+}}
+</script>
+"""
+
+NEW_MESSAGE_BODY = """
+<main>
+  <div role="dialog">
+    <h1>New message</h1>
+    <input name="queryBox" type="text" placeholder="Search..." oninput="search(this.value)">
+    <div id="results"></div>
+    <div id="chat"></div>
+  </div>
+</main>
+<script>
+var timer = null;
+function search(query) {{
+  clearTimeout(timer);
+  timer = setTimeout(function () {{
+    fetch('/api/search?q=' + encodeURIComponent(query)).then(function (r) {{ return r.json(); }}).then(function (users) {{
+      var results = document.getElementById('results');
+      results.innerHTML = '';
+      users.forEach(function (user) {{
+        var row = document.createElement('div');
+        row.setAttribute('role', 'button');
+        row.onclick = function () {{ select(user); }};
+        var span = document.createElement('span');
+        span.innerText = user;
+        row.appendChild(span);
+        results.appendChild(row);
+      }});
+    }});
+  }}, {search_delay_ms});
+}}
+function select(user) {{
+  var chat = document.getElementById('chat');
+  chat.innerHTML = '';
+  var button = document.createElement('div');
+  button.setAttribute('role', 'button');
+  button.innerText = 'Chat';
+  button.onclick = function () {{ location.href = '/direct/t/' + encodeURIComponent(user) + '/'; }};
+  chat.appendChild(button);
+}}
+</script>
+"""
+
+ERROR_BODY = """<h1>5xx Server Error</h1>"""
+
+
+class FakeInstagram(object):
+    """模擬伺服器的設定與統計"""
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, search_delay=0.3, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.search_delay = search_delay
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.sent = []
+        self.requests = 0
+
+    def delay(self):
+        wait = self.latency + self.random.uniform(0, self.jitter)
+        if wait > 0:
+            time.sleep(wait)
+
+    def should_fail(self):
+        return self.failure_rate > 0 and self.random.random() < self.failure_rate
+
+    def record_send(self, username, text):
+        with self.lock:
+            self.sent.append({'username': username, 'text': text, 'at': time.time()})
+
+    def stats(self):
+        with self.lock:
+            return {'requests': self.requests, 'sent': len(self.sent), 'messages': list(self.sent)}
+
+
+def profile_kind(username):
+    for prefix, kind in (('private_', 'private'), ('missing_', 'missing'), ('follow_', 'follow')):
+        if username.startswith(prefix):
+            return kind
+    return 'normal'
+
+
+def make_handler(server_state):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def log_message(self, format, *args):
+            pass
+
+        def _logged_in(self):
+            cookies = self.headers.get('Cookie', '')
+            return any(part.strip().startswith(SESSION_COOKIE + '=') for part in cookies.split(';'))
+
+        def _send(self, status, body, content_type='text/html; charset=utf-8', headers=None):
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _page(self, title, body, status=200):
+            self._send(status, PAGE_TEMPLATE.format(title=escape(title), body=body))
+
+        def _redirect(self, location, headers=None):
+            self.send_response(302)
+            self.send_header('Location', location)
+            self.send_header('Content-Length', '0')
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+
+        def do_GET(self):
+            with server_state.lock:
+                server_state.requests += 1
+            url = urlparse(self.path)
+            path = url.path
+
+            if path == '/__stats':
+                return self._send(200, json.dumps(server_state.stats()), 'application/json')
+
+            if path.startswith('/api/search'):
+                query = parse_qs(url.query).get('q', [''])[0].strip()
+                users = [query] if query and profile_kind(query) != 'missing' else []
+                return self._send(200, json.dumps(users), 'application/json')
+
+            server_state.delay()
+
+            if path.startswith('/accounts/login'):
+                return self._page('Login • Instagram', LOGIN_BODY.format(error=''))
+
+            if not self._logged_in():
+                return self._redirect('/accounts/login/')
+
+            if server_state.should_fail():
+                return self._page('Error', ERROR_BODY, status=503)
+
+            if path in ('/', ''):
+                return self._page('Instagram', HOME_BODY)
+
+            if path.startswith('/direct/new'):
+                return self._page('New message • Instagram', NEW_MESSAGE_BODY.format(
+                    search_delay_ms=int(server_state.search_delay * 1000)
+                ))
+
+            if path.startswith('/direct/t/'):
+                username = path.strip('/').split('/')[-1]
+                return self._page('Direct • Instagram', THREAD_BODY.format(
+                    username=escape(username), username_json=json.dumps(username)
+                ))
+
+            username = path.strip('/').split('/')[0]
+            kind = profile_kind(username)
+            if kind == 'missing':
+                return self._page('Page not found • Instagram', NOT_FOUND_BODY, status=404)
+
+            if kind == 'private':
+                actions, notice = FOLLOW_BUTTON, '<h2>This Account is Private</h2>'
+            elif kind == 'follow':
+                actions, notice = FOLLOW_BUTTON, '<span>Follow to message</span>'
+            else:
+                actions, notice = FOLLOW_BUTTON + MESSAGE_BUTTON.format(username=escape(username)), ''
+
+            return self._page(f'@{username} • Instagram', PROFILE_BODY.format(
+                username=escape(username), actions=actions, notice=notice
+            ))
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            raw = self.rfile.read(length).decode('utf-8') if length else ''
+            path = urlparse(self.path).path
+
+            if path.startswith('/accounts/login'):
+                server_state.delay()
+                form = parse_qs(raw)
+                if form.get('password', [''])[0] == 'wrong':
+                    error = '<p role="alert">Sorry, your password was incorrect.</p>'
+                    return self._page('Login • Instagram', LOGIN_BODY.format(error=error))
+                return self._redirect('/', headers={
+                    'Set-Cookie': f'{SESSION_COOKIE}=fake-{int(time.time())}; Path=/; Max-Age=86400'
+                })
+
+            if path == '/api/send':
+                if not self._logged_in():
+                    return self._send(401, '{}', 'application/json')
+                if server_state.should_fail():
+                    return self._send(500, '{}', 'application/json')
+                payload = json.loads(raw or '{}')
+                server_state.record_send(payload.get('username'), payload.get('text'))
+                return self._send(200, '{"status": "ok"}', 'application/json')
+
+            return self._send(404, '{}', 'application/json')
+
+    return Handler
+
+
+def start_server(host='127.0.0.1', port=0, **options):
+    """在背景執行緒啟動模擬伺服器，回傳 (server, state, base_url)"""
+    state = FakeInstagram(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-instagram', daemon=True).start()
+    return server, state, f'http://{host}:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地 Instagram 模擬伺服器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='每個頁面回應前的延遲秒數')
+    parser.add_argument('--jitter', type=float, default=0.0, help='額外隨機延遲上限秒數')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='頁面與發送 API 回傳錯誤的機率')
+    parser.add_argument('--search-delay', type=float, default=0.3, help='/direct/new/ 搜尋結果出現前的延遲秒數')
+    args = parser.parse_args()
+
+    server, _, base_url = start_server(
+        args.host, args.port,
+        latency=args.latency, jitter=args.jitter,
+        failure_rate=args.failure_rate, search_delay=args.search_delay
+    )
+    print(f"🧪 模擬 Instagram 伺服器: {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+端對端效能測試
+啟動本地 Instagram 模擬伺服器，以真實的 Chrome 透過 /send_dms → /jobs/<id> 完整流程發送一批 DM，
+回報各階段延遲的 p50 / p95 與每小時可發送數量
+
+需要本機已安裝 Chrome 與 ChromeDriver。發送間隔與發送限制在測試中設為 0 / 無上限，
+messages/hour 代表瀏覽器端的最大吞吐量，不含刻意加入的隨機等待。
+
+用法:
+    python benchmarks/run_benchmark.py --messages 20 --latency 0.2 --send-path profile
+    python benchmarks/run_benchmark.py --messages 20 --send-path inbox --mix
+"""
+
+import os
+import sys
+import time
+import json
+import argparse
+import tempfile
+import statistics
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_instagram import start_server
+
+# 以包裝 InstagramBot 方法的方式量測的階段
+PHASES = [
+    ('setup_driver', 'driver_setup'),
+    ('login', 'login'),
+    ('restore_session', 'session_restore'),
+    ('navigate', 'navigation'),
+    ('classify_profile', 'page_classify'),
+    ('open_composer_via_inbox', 'inbox_open'),
+    ('type_and_send', 'compose_and_send'),
+    ('send_direct_message', 'message_total'),
+]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def instrument(bot, timings):
+    """包裝 bot 的方法，記錄每次呼叫的耗時"""
+    for method_name, phase in PHASES:
+        original = getattr(bot, method_name)
+
+        def timed(*args, _original=original, _phase=phase, **kwargs):
+            start = time.monotonic()
+            try:
+                return _original(*args, **kwargs)
+            finally:
+                timings[_phase].append(time.monotonic() - start)
+
+        setattr(bot, method_name, timed)
+
+
+def build_batch(count, mix):
+    """建立測試資料；mix 時混入私人、不存在與需追蹤的帳號"""
+    rows = []
+    kinds = ['user', 'private_user', 'missing_user', 'follow_user'] if mix else ['user']
+    for i in range(count):
+        prefix = kinds[i % len(kinds)]
+        rows.append({
+            'rowIndex': i + 2,
+            'igUsername': f'{prefix}{i}',
+            'dmContent': f'您好！這是第 {i + 1} 則效能測試訊息，恭喜新開幕 🎉'
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Instagram DM Bot 端對端效能測試')
+    parser.add_argument('--messages', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.2, help='模擬伺服器每頁延遲秒數')
+    parser.add_argument('--jitter', type=float, default=0.1)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--send-path', choices=['profile', 'inbox'], default='profile')
+    parser.add_argument('--mix', action='store_true', help='混入私人 / 不存在 / 需追蹤的帳號')
+    parser.add_argument('--output', help='將結果以 JSON 寫入指定檔案')
+    args = parser.parse_args()
+
+    server, fake, base_url = start_server(
+        latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate, seed=42
+    )
+    workdir = tempfile.mkdtemp(prefix='igbot-bench-')
+    os.environ.update({
+        'INSTAGRAM_BASE_URL': base_url,
+        'INSTAGRAM_USERNAME': 'bench_user',
+        'INSTAGRAM_PASSWORD': 'bench_password',
+        'BOT_DB_PATH': os.path.join(workdir, 'bot.db'),
+        'SESSION_COOKIE_FILE': os.path.join(workdir, 'session_cookies.json'),
+        'SEND_PATH': args.send_path,
+        'MIN_INTERVAL': '0',
+        'MAX_INTERVAL': '0',
+        'DAILY_LIMIT': str(args.messages * 10),
+        'HOURLY_LIMIT': str(args.messages * 10),
+        'EAGER_START': 'false',
+    })
+
+    import app
+
+    timings = defaultdict(list)
+    instrument(app.bot, timings)
+    client = app.app.test_client()
+
+    batch = build_batch(args.messages, args.mix)
+    start = time.monotonic()
+    response = client.post('/send_dms', json={'action': 'send_dms', 'data': batch})
+    submit_ms = (time.monotonic() - start) * 1000
+    job_id = response.get_json()['job_id']
+
+    while True:
+        job = client.get(f'/jobs/{job_id}').get_json()
+        if job['status'] in ('completed', 'failed'):
+            break
+        time.sleep(0.2)
+    elapsed = time.monotonic() - start
+
+    app.bot.close()
+    server.shutdown()
+
+    summary = job['summary']
+    result = {
+        'send_path': args.send_path,
+        'messages': args.messages,
+        'latency': args.latency,
+        'failure_rate': args.failure_rate,
+        'job_status': job['status'],
+        'submit_ms': round(submit_ms, 1),
+        'batch_seconds': round(elapsed, 2),
+        'summary': summary,
+        'delivered': fake.stats()['sent'],
+        'messages_per_hour': round(summary['success'] / elapsed * 3600, 1) if elapsed else None,
+        'outcomes': dict((f'{result}:{reason}', count)
+                         for (result, reason), count in app.MESSAGES_TOTAL.values.items()),
+        'phases': dict((phase, {
+            'count': len(samples),
+            'p50_ms': round(percentile(samples, 50) * 1000, 1),
+            'p95_ms': round(percentile(samples, 95) * 1000, 1),
+            'mean_ms': round(statistics.mean(samples) * 1000, 1)
+        }) for phase, samples in timings.items() if samples)
+    }
+
+    print(f"送出路徑: {args.send_path}，訊息數: {args.messages}，模擬延遲: {args.latency}s，失敗率: {args.failure_rate}")
+    print(f"/send_dms 回應: {result['submit_ms']} ms，整批耗時: {result['batch_seconds']} s，任務狀態: {job['status']}")
+    print(f"成功 {summary['success']} / 失敗 {summary['failed']}，伺服器實際收到 {result['delivered']} 則")
+    print(f"吞吐量: {result['messages_per_hour']} messages/hour")
+    print(f"結果分類: {result['outcomes']}")
+    print(f"{'階段':<20}{'次數':>6}{'p50 (ms)':>12}{'p95 (ms)':>12}")
+    for phase, stats in result['phases'].items():
+        print(f"{phase:<20}{stats['count']:>6}{stats['p50_ms']:>12}{stats['p95_ms']:>12}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+瀏覽器工作執行緒
+WebDriver 不是執行緒安全的，所有瀏覽器操作（初始化、登入、發送、回收）都交由唯一的工作執行緒依序執行，
+其他執行緒（HTTP 請求、任務佇列、預熱、回收監控）只把工作放進佇列並等待結果
+"""
+
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserWorker(object):
+    """擁有瀏覽器的單一執行緒，依提交順序執行工作"""
+
+    def __init__(self, name='browser-worker'):
+        self.name = name
+        self.tasks = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """提交工作，回傳 Future；在工作執行緒內呼叫時直接執行，避免自己等待自己"""
+        future = Future()
+        if self.in_worker():
+            self._execute(future, func, args, kwargs)
+            return future
+
+        self._ensure_thread()
+        self.tasks.put((future, func, args, kwargs))
+        return future
+
+    def run(self, func, *args, **kwargs):
+        """提交工作並等待結果；工作拋出的例外會在呼叫端重新拋出"""
+        return self.submit(func, *args, **kwargs).result()
+
+    def in_worker(self):
+        return threading.current_thread() is self.thread
+
+    def pending(self):
+        """等待執行的工作數量"""
+        return self.tasks.qsize()
+
+    def _ensure_thread(self):
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self.thread.start()
+
+    def _execute(self, future, func, args, kwargs):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    def _loop(self):
+        while True:
+            future, func, args, kwargs = self.tasks.get()
+            try:
+                self._execute(future, func, args, kwargs)
+            except Exception as e:
+                logger.error(f"❌ 瀏覽器工作執行失敗: {str(e)}")
+            finally:
+                self.tasks.task_done()
+
+
+class SingleFlight(object):
+    """同時呼叫時只執行一次：第一個呼叫者執行，其餘呼叫者等待並共用同一個結果（或例外）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.future = None
+
+    def run(self, func, *args, **kwargs):
+        with self.lock:
+            future = self.future
+            leader = future is None
+            if leader:
+                future = self.future = Future()
+
+        if leader:
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self.lock:
+                    self.future = None
+        return future.result()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+任務結果回呼
+/send_dms 帶有 callback_url 時，每一筆的結果會累積成批次 POST 回呼叫端（例如 Apps Script Web App），
+呼叫端不必保持連線或輪詢 /jobs；送出失敗時以指數退避重試
+"""
+
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class CallbackNotifier(object):
+    """
+    依任務累積結果並批次送出
+
+    batch_size: 累積幾筆就送出
+    flush_interval: 第一筆結果等待超過幾秒就送出（不足 batch_size 也送）
+    store: 提供 next_callback_seq(job_id) 的物件（例如 JobQueue），批次序號保存於資料庫，重啟後接續；
+           為 None 時只記錄在記憶體
+    """
+
+    def __init__(self, batch_size=10, flush_interval=5, max_retries=5, backoff=1.0, timeout=10, store=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.store = store
+        self.session = None  # 第一次送出時才建立（requests 不在服務啟動時載入）
+        self.condition = threading.Condition()
+        self.buffers = {}  # job_id -> {'url', 'results', 'first_at', 'final'}
+        self.sequences = {}  # job_id -> 已送出的批次序號（沒有 store 時使用）
+        self.thread = None
+        self.stats = {'delivered': 0, 'failed': 0, 'retries': 0}
+
+    def add(self, job_id, url, result):
+        """加入一筆結果"""
+        with self.condition:
+            buffer = self._buffer(job_id, url)
+            buffer['results'].append(result)
+            if len(buffer['results']) >= self.batch_size:
+                self.condition.notify()
+        self._ensure_thread()
+
+    def finish(self, job_id, url, status, error=None, summary=None):
+        """任務結束：立即送出剩餘結果並附上最終狀態"""
+        with self.condition:
+            buffer = self._buffer(job_id, url)
+            buffer['final'] = {'status': status, 'error': error, 'summary': summary}
+            self.condition.notify()
+        self._ensure_thread()
+
+    def _buffer(self, job_id, url):
+        buffer = self.buffers.get(job_id)
+        if buffer is None:
+            buffer = self.buffers[job_id] = {
+                'url': url, 'results': [], 'first_at': time.monotonic(), 'final': None
+            }
+        return buffer
+
+    def _ensure_thread(self):
+        with self.condition:
+            if self.thread and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._loop, name='callback-sender', daemon=True)
+            self.thread.start()
+
+    def _ready_batches(self):
+        """取出達到送出條件的批次（需持有 condition）"""
+        now = time.monotonic()
+        batches = []
+        for job_id, buffer in list(self.buffers.items()):
+            due = (len(buffer['results']) >= self.batch_size
+                   or buffer['final'] is not None
+                   or (buffer['results'] and now - buffer['first_at'] >= self.flush_interval))
+            if not due:
+                continue
+
+            del self.buffers[job_id]
+            payload = {
+                'job_id': job_id,
+                'seq': None,  # 離開 condition 後由 _next_seq() 指定
+                'results': buffer['results'],
+                'final': buffer['final'] is not None
+            }
+            if buffer['final'] is not None:
+                payload.update(buffer['final'])
+            batches.append((buffer['url'], payload))
+        return batches
+
+    def _loop(self):
+        while True:
+            with self.condition:
+                batches = self._ready_batches()
+                if not batches:
+                    self.condition.wait(self.flush_interval)
+                    continue
+
+            for url, payload in batches:
+                payload['seq'] = self._next_seq(payload['job_id'], payload['final'])
+                self._deliver(url, payload)
+
+    def _next_seq(self, job_id, final):
+        """任務的下一個批次序號（只在送出執行緒呼叫，序號依送出順序遞增）"""
+        if self.store is not None:
+            return self.store.next_callback_seq(job_id)
+        seq = self.sequences.get(job_id, 0) + 1
+        if final:
+            self.sequences.pop(job_id, None)
+        else:
+            self.sequences[job_id] = seq
+        return seq
+
+    def _deliver(self, url, payload):
+        """POST 一個批次，失敗時以指數退避重試"""
+        import requests
+
+        if self.session is None:
+            self.session = requests.Session()
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout)
+                if response.status_code < 400:
+                    self.stats['delivered'] += 1
+                    logger.info(f"📤 已回呼任務 {payload['job_id']} 的 {len(payload['results'])} 筆結果 (批次 {payload['seq']})")
+                    return True
+                # 4xx（429 除外）代表呼叫端拒絕，重試也不會成功
+                if response.status_code < 500 and response.status_code != 429:
+                    logger.error(f"❌ 回呼被拒絕 (HTTP {response.status_code}): {url}")
+                    break
+                error = f"HTTP {response.status_code}"
+            except requests.RequestException as e:
+                error = str(e)
+
+            if attempt < self.max_retries:
+                wait = self.backoff * (2 ** attempt)
+                self.stats['retries'] += 1
+                logger.warning(f"⚠️ 回呼失敗（{error}），{wait:.1f} 秒後重試 ({attempt + 1}/{self.max_retries})")
+                time.sleep(wait)
+
+        self.stats['failed'] += 1
+        logger.error(f"❌ 任務 {payload['job_id']} 的回呼批次 {payload['seq']} 送出失敗，結果仍可由 /jobs 查詢")
+        return False
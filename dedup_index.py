@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+已發送訊息索引
+Google Apps Script 重試或觸發器重疊時會重送相同的資料列，以「帳號 + 訊息內容雜湊」
+（或呼叫端提供的 idempotencyKey）為主鍵記錄已成功發送的訊息，重複的項目直接回傳原本的結果，不再開啟瀏覽器
+"""
+
+import json
+import time
+import hashlib
+import logging
+from datetime import datetime
+
+from job_queue import connect
+
+logger = logging.getLogger(__name__)
+
+# 一次 IN (...) 查詢的主鍵數上限（SQLite 的參數數量限制）
+LOOKUP_CHUNK = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sent_messages (
+    dedup_key TEXT PRIMARY KEY,
+    ig_username TEXT,
+    result TEXT NOT NULL,
+    sent_at REAL NOT NULL
+);
+"""
+
+
+def dedup_key(dm_item):
+    """計算資料列的去重主鍵：有 idempotencyKey 時以其為準，否則使用帳號與訊息內容的雜湊"""
+    if dm_item.get('idempotencyKey'):
+        return 'key:' + str(dm_item['idempotencyKey'])
+    username = str(dm_item.get('igUsername') or '').strip().lower()
+    content = hashlib.sha256(str(dm_item.get('dmContent') or '').encode('utf-8')).hexdigest()
+    return f'msg:{username}:{content}'
+
+
+class DedupIndex(object):
+    """
+    持久化的已發送索引（與任務佇列共用 SQLite）
+
+    ttl: 記錄保留秒數，超過後相同訊息可再次發送；0 表示永久保留
+    """
+
+    def __init__(self, db_path, ttl=0):
+        self.db_path = db_path
+        self.ttl = ttl
+        with connect(self.db_path) as conn:
+            conn.executescript(SCHEMA)
+
+    def lookup(self, dm_item):
+        """已發送過時回傳原本的結果（標記 duplicate），否則回傳 None"""
+        return self.lookup_many([dm_item])[0]
+
+    def lookup_many(self, dm_items):
+        """以一次連線查詢整批資料列，回傳與 dm_items 對應的結果（未發送過的項目為 None）"""
+        keys = [dedup_key(dm_item) for dm_item in dm_items]
+        unique = list(set(keys))
+        rows = {}
+        if unique:
+            with connect(self.db_path) as conn:
+                for start in range(0, len(unique), LOOKUP_CHUNK):
+                    chunk = unique[start:start + LOOKUP_CHUNK]
+                    for row in conn.execute(
+                        "SELECT dedup_key, result, sent_at FROM sent_messages "
+                        f"WHERE dedup_key IN ({','.join('?' * len(chunk))})", chunk
+                    ):
+                        rows[row['dedup_key']] = row
+        return [self._duplicate(dm_item, rows.get(key)) for dm_item, key in zip(dm_items, keys)]
+
+    def _duplicate(self, dm_item, row):
+        if row is None or (self.ttl and row['sent_at'] < time.time() - self.ttl):
+            return None
+
+        result = json.loads(row['result'])
+        result.update(
+            rowIndex=dm_item.get('rowIndex'),
+            duplicate=True,
+            sent_at=datetime.fromtimestamp(row['sent_at']).isoformat(timespec='seconds')
+        )
+        return result
+
+    def record(self, dm_item, result):
+        """記錄一筆成功發送的結果，並清除已過期的記錄"""
+        with connect(self.db_path) as conn:
+            if self.ttl:
+                conn.execute("DELETE FROM sent_messages WHERE sent_at < ?", (time.time() - self.ttl,))
+            conn.execute(
+                "INSERT INTO sent_messages (dedup_key, ig_username, result, sent_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(dedup_key) DO UPDATE SET result = excluded.result, sent_at = excluded.sent_at",
+                (dedup_key(dm_item), dm_item.get('igUsername'), json.dumps(result, ensure_ascii=False), time.time())
+            )
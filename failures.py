@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+發送失敗原因分類
+每一次發送失敗都記錄為一個原因，並分為三類：
+暫時性（逾時、元素過期、瀏覽器錯誤或斷線）可以退避後重試；會話失效需要重新登入後重試；
+永久性（帳號不存在、私人帳號、找不到訊息按鈕、已按下發送但無法確認）重試也不會成功或可能重複發送，不重試
+瀏覽器無法啟動或登入（browser_unavailable）不逐列重試，由任務佇列直接結束整個任務
+"""
+
+from page_probe import PAGE_NOT_FOUND, PAGE_PRIVATE, PAGE_FOLLOW_REQUIRED
+
+# 失敗原因（頁面狀態 not_found / private / follow_required 沿用 page_probe 的常數）
+FAILURE_TIMEOUT = 'timeout'
+FAILURE_STALE_ELEMENT = 'stale_element'
+FAILURE_CLICK_INTERCEPTED = 'click_intercepted'
+FAILURE_BROWSER_ERROR = 'browser_error'
+FAILURE_BROWSER_DISCONNECTED = 'browser_disconnected'
+FAILURE_BROWSER_UNAVAILABLE = 'browser_unavailable'
+FAILURE_BUTTON_NOT_FOUND = 'button_not_found'
+FAILURE_SEND_BUTTON_NOT_FOUND = 'send_button_not_found'
+FAILURE_NOT_LOGGED_IN = 'not_logged_in'
+FAILURE_SESSION_EXPIRED = 'session_expired'
+FAILURE_UNCONFIRMED = 'unconfirmed'
+FAILURE_INVALID = 'invalid'
+FAILURE_ERROR = 'error'
+
+# 分類
+CLASS_TRANSIENT = 'transient'
+CLASS_SESSION = 'session'
+CLASS_PERMANENT = 'permanent'
+
+FAILURE_CLASSES = {
+    FAILURE_TIMEOUT: CLASS_TRANSIENT,
+    FAILURE_STALE_ELEMENT: CLASS_TRANSIENT,
+    FAILURE_CLICK_INTERCEPTED: CLASS_TRANSIENT,
+    FAILURE_BROWSER_ERROR: CLASS_TRANSIENT,
+    FAILURE_BROWSER_DISCONNECTED: CLASS_TRANSIENT,
+    FAILURE_SEND_BUTTON_NOT_FOUND: CLASS_TRANSIENT,
+    FAILURE_NOT_LOGGED_IN: CLASS_SESSION,
+    FAILURE_SESSION_EXPIRED: CLASS_SESSION,
+    PAGE_NOT_FOUND: CLASS_PERMANENT,
+    PAGE_PRIVATE: CLASS_PERMANENT,
+    PAGE_FOLLOW_REQUIRED: CLASS_PERMANENT,
+    FAILURE_BUTTON_NOT_FOUND: CLASS_PERMANENT,
+    FAILURE_BROWSER_UNAVAILABLE: CLASS_PERMANENT,
+    FAILURE_UNCONFIRMED: CLASS_PERMANENT,
+    FAILURE_INVALID: CLASS_PERMANENT,
+    FAILURE_ERROR: CLASS_PERMANENT,
+}
+
+FAILURE_MESSAGES = {
+    FAILURE_TIMEOUT: '頁面載入或元素等待逾時',
+    FAILURE_STALE_ELEMENT: '頁面元素已更新，操作失效',
+    FAILURE_CLICK_INTERCEPTED: '點擊被其他元素遮擋',
+    FAILURE_BROWSER_ERROR: '瀏覽器錯誤',
+    FAILURE_BROWSER_DISCONNECTED: '瀏覽器已斷線',
+    FAILURE_BROWSER_UNAVAILABLE: '無法初始化瀏覽器或登入',
+    FAILURE_BUTTON_NOT_FOUND: '找不到訊息按鈕',
+    FAILURE_SEND_BUTTON_NOT_FOUND: '找不到發送按鈕',
+    FAILURE_NOT_LOGGED_IN: '尚未登入 Instagram',
+    FAILURE_SESSION_EXPIRED: '登入會話已失效',
+    PAGE_NOT_FOUND: '用戶不存在或已被刪除',
+    PAGE_PRIVATE: '私人帳號，無法發送訊息',
+    PAGE_FOLLOW_REQUIRED: '需要先關注才能發送訊息',
+    FAILURE_UNCONFIRMED: '已按下發送但無法確認結果，為避免重複發送不重試',
+    FAILURE_INVALID: '資料格式錯誤',
+    FAILURE_ERROR: '發送失敗',
+}
+
+
+def failure_class(reason):
+    """失敗原因的分類，未知的原因視為永久性"""
+    return FAILURE_CLASSES.get(reason, CLASS_PERMANENT)
+
+
+def is_retryable(reason):
+    return failure_class(reason) in (CLASS_TRANSIENT, CLASS_SESSION)
+
+
+def failure_message(reason):
+    return FAILURE_MESSAGES.get(reason, FAILURE_MESSAGES[FAILURE_ERROR])
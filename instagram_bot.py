@@ -12,14 +12,8 @@ import os
 from dotenv import load_dotenv
 from datetime import datetime
 from flask import Flask, request, jsonify
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from validation import ValidationError, validate_dm_list
+from waits import url_left, message_sent
 
 # 設定日誌
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -53,6 +47,21 @@ hourly_sent_count = 0
 last_reset_hour = datetime.now().hour
 last_sent_time = 0
 
+# Selenium 在第一次建立瀏覽器時才由 load_selenium() 載入
+webdriver = By = WebDriverWait = EC = Options = TimeoutException = NoSuchElementException = None
+
+def load_selenium():
+    """載入 Selenium（只在第一次呼叫時實際匯入）"""
+    global webdriver, By, WebDriverWait, EC, Options, TimeoutException, NoSuchElementException
+    if NoSuchElementException is not None:
+        return
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.chrome.options import Options
+    from selenium.common.exceptions import TimeoutException, NoSuchElementException
+
 class InstagramBot:
     def __init__(self):
         self.driver = None
@@ -61,6 +70,7 @@ class InstagramBot:
     def setup_driver(self):
         """設定 Chrome 瀏覽器"""
         try:
+            load_selenium()
             chrome_options = Options()
             chrome_options.add_argument('--headless')  # 無頭模式
             chrome_options.add_argument('--no-sandbox')
@@ -103,8 +113,14 @@ class InstagramBot:
             login_button = self.driver.find_element(By.XPATH, "//button[@type='submit']")
             login_button.click()
             
-            # 等待登入完成
-            time.sleep(5)
+            # 等待登入完成：離開登入頁，或出現錯誤提示
+            try:
+                WebDriverWait(self.driver, 15).until(EC.any_of(
+                    url_left('/accounts/login'),
+                    EC.presence_of_element_located((By.XPATH, "//*[@role='alert' or @id='slfErrorAlert']"))
+                ))
+            except TimeoutException:
+                logger.warning("等待登入結果逾時")
             
             # 檢查是否登入成功
             if "instagram.com" in self.driver.current_url and "login" not in self.driver.current_url:
@@ -167,8 +183,11 @@ class InstagramBot:
             send_button = self.driver.find_element(By.XPATH, "//button[text()='傳送']")
             send_button.click()
             
-            # 等待發送完成
-            time.sleep(3)
+            # 等待發送完成：輸入框清空且訊息出現在對話中
+            try:
+                WebDriverWait(self.driver, 10).until(message_sent("//textarea[@placeholder]", message))
+            except TimeoutException:
+                logger.warning(f"⚠️ 無法確認訊息已顯示於對話中 (@{username})")
             
             logger.info(f"✅ 成功發送 DM 給 @{username}")
             return True
@@ -244,19 +263,35 @@ def send_dms():
     """發送 DM 端點"""
     try:
         data = request.json
-        logger.info(f"收到 DM 發送請求，共 {len(data.get('data', []))} 個項目")
-        
         if not data or 'data' not in data:
             return jsonify({
                 'success': False,
                 'error': '無效的請求資料'
             }), 400
         
-        dm_list = data['data']
+        # 啟動瀏覽器之前先驗證並正規化所有資料列
+        try:
+            dm_list, invalid = validate_dm_list(data['data'])
+        except ValidationError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        logger.info(f"收到 DM 發送請求，共 {len(dm_list)} 個項目" + (f"（{len(invalid)} 個資料格式錯誤）" if invalid else ''))
+        
+        # 空的批次照常回傳空的結果；只有每一列都無效時才拒絕
+        if invalid and len(invalid) == len(dm_list):
+            return jsonify({
+                'success': False,
+                'error': '沒有可發送的資料列',
+                'invalid': invalid
+            }), 400
+        
         results = []
+        errors = dict((error['index'], error) for error in invalid)
         
-        # 確保 Bot 已初始化和登入
-        if not bot.driver:
+        # 確保 Bot 已初始化和登入（沒有資料列時不必啟動瀏覽器）
+        if dm_list and not bot.driver:
             logger.info("初始化 Instagram Bot...")
             if not bot.setup_driver():
                 return jsonify({
@@ -264,7 +299,7 @@ def send_dms():
                     'error': '無法初始化瀏覽器'
                 }), 500
         
-        if not bot.is_logged_in:
+        if dm_list and not bot.is_logged_in:
             logger.info("登入 Instagram...")
             if not bot.login():
                 return jsonify({
@@ -273,7 +308,15 @@ def send_dms():
                 }), 500
         
         # 處理每個 DM
-        for dm_item in dm_list:
+        for index, dm_item in enumerate(dm_list):
+            if dm_item is None:
+                results.append({
+                    'rowIndex': errors[index]['rowIndex'],
+                    'igUsername': errors[index]['igUsername'],
+                    'success': False,
+                    'error': errors[index]['error']
+                })
+                continue
             try:
                 # 檢查發送限制
                 can_send, limit_message = check_rate_limits()
@@ -327,6 +370,7 @@ def send_dms():
         return jsonify({
             'success': True,
             'results': results,
+            'invalid': invalid,
             'summary': {
                 'total': total_count,
                 'success': success_count,
@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+"""
+DM 發送任務佇列
+/send_dms 只負責建立任務並立即回傳 job_id，實際發送由背景工作執行緒逐筆處理
+任務與每一列的狀態都寫入 SQLite，容器重啟後會自動接續未完成的項目
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# 任務狀態（created: 已寫入但已知結果尚未通知，工作執行緒不會處理）
+JOB_CREATED = 'created'
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+
+# 單筆狀態
+ROW_PENDING = 'pending'
+ROW_IN_FLIGHT = 'in_flight'
+ROW_SENT = 'sent'
+ROW_FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    error TEXT,
+    total INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    callback_url TEXT,
+    callback_seq INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS job_rows (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    row_index TEXT,
+    ig_username TEXT,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    result TEXT,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_job_rows_state ON job_rows (job_id, state, seq);
+CREATE TABLE IF NOT EXISTS kv_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class JobAborted(Exception):
+    """
+    處理函式拋出此例外代表整個任務無法繼續（例如瀏覽器無法啟動）：
+    目前這一列以 result 記錄，其餘尚未處理的項目標記為失敗，任務標記為 failed
+    """
+
+    def __init__(self, error, result):
+        super().__init__(error)
+        self.error = error
+        self.result = result
+
+
+# 已建立目錄並切換為 WAL 的資料庫（WAL 會保存在資料庫檔案中，每個路徑只需設定一次）
+_initialized = set()
+
+
+@contextmanager
+def connect(db_path):
+    """開啟 SQLite 連線（每次操作各自開啟，避免跨執行緒共用），離開時提交並關閉"""
+    first = db_path not in _initialized
+    if first:
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if first:
+        conn.execute('PRAGMA journal_mode=WAL')
+        _initialized.add(db_path)
+    conn.execute('PRAGMA synchronous=NORMAL')
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+class JobQueue:
+    """
+    依序處理 DM 任務的持久化佇列
+
+    prepare(): 任務開始前呼叫，回傳 (是否可繼續, 錯誤訊息)
+    handler(dm_item): 處理單筆資料，回傳與原本 /send_dms 相同格式的 result dict
+    throttle(): 每筆發送前呼叫，回傳 (需等待秒數, 原因)；需等待時該筆維持 pending，等到可發送時再處理
+    schedule(count): 預估接下來 count 筆的發送時間（距離現在的秒數），用於回報 ETA
+    lookup(dm_item): 建立任務與發送前呼叫，結果已知時（已發送過、已知無法發送）回傳 result dict，該筆不會再交給 handler
+    lookup_many(dm_list): 建立任務時一次查詢整批，回傳與 dm_list 對應的結果；未提供時逐筆呼叫 lookup
+
+    subscribe(listener) 註冊的 listener(job_id, event, data) 會在每一筆產生結果（event='result'，data 為 result dict）
+    與任務結束（event='finished'，data 為 {'status', 'error'}）時被呼叫
+    """
+
+    def __init__(self, handler, prepare=None, db_path='data/bot.db', throttle=None, schedule=None, lookup=None,
+                 lookup_many=None):
+        self.handler = handler
+        self.prepare = prepare
+        self.throttle = throttle
+        self.schedule = schedule
+        self.lookup = lookup
+        self.lookup_many = lookup_many
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.worker = None
+        self.listeners = []
+        self.callback_urls = {}  # job_id -> callback_url（任務結束後移除），listener 每筆結果都會查詢
+
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # 舊版資料庫沒有 callback_url 欄位
+            columns = [row['name'] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if 'callback_url' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN callback_url TEXT")
+            if 'callback_seq' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN callback_seq INTEGER NOT NULL DEFAULT 0")
+
+    def _connect(self):
+        return connect(self.db_path)
+
+    def _recover(self):
+        """重啟後處理上次中斷的任務，中斷的項目經由一般的結果事件通知（需在 listener 註冊之後呼叫）"""
+        now = datetime.now().isoformat()
+        recovered = []
+        with self.lock, self._connect() as conn:
+            # 中斷時正在發送的項目無法確認是否已送出，標記為失敗以免重複發送
+            interrupted = conn.execute(
+                "SELECT job_id, seq, row_index, ig_username FROM job_rows WHERE state = ?",
+                (ROW_IN_FLIGHT,)
+            ).fetchall()
+            for row in interrupted:
+                result = {
+                    'rowIndex': json.loads(row['row_index']),
+                    'igUsername': row['ig_username'],
+                    'success': False,
+                    'error': '服務重啟時此項目正在發送，無法確認是否已送出'
+                }
+                conn.execute(
+                    "UPDATE job_rows SET state = ?, result = ?, updated_at = ? WHERE job_id = ? AND seq = ?",
+                    (ROW_FAILED, json.dumps(result, ensure_ascii=False), now, row['job_id'], row['seq'])
+                )
+                recovered.append((row['job_id'], result))
+
+            # 建立後、通知已知結果前中斷的任務
+            created = [row['job_id'] for row in conn.execute("SELECT job_id FROM jobs WHERE status = ?", (JOB_CREATED,))]
+
+        if interrupted:
+            logger.warning(f"⚠️ {len(interrupted)} 個項目在重啟前正在發送，已標記為失敗")
+        for job_id, result in recovered:
+            self._emit(job_id, 'result', result)
+        for job_id in created:
+            self._release(job_id, [result for seq, result in self.finished_rows(job_id)])
+
+    def start(self):
+        """服務啟動時呼叫（listener 註冊之後）：處理中斷的項目，若有未完成的任務則恢復處理"""
+        self._recover()
+        unfinished = self.queued_count()
+        if unfinished:
+            logger.info(f"🔄 發現 {unfinished} 個未完成的任務，恢復處理")
+            self._ensure_worker()
+
+    def subscribe(self, listener):
+        """註冊任務事件的 listener"""
+        self.listeners.append(listener)
+
+    def _emit(self, job_id, event, data):
+        for listener in self.listeners:
+            try:
+                listener(job_id, event, data)
+            except Exception as e:
+                logger.warning(f"任務事件處理失敗 ({event}): {str(e)}")
+
+    def submit(self, dm_list, callback_url=None, known=None):
+        """
+        建立任務並寫入佇列，回傳 job_id
+        known: 與 dm_list 對應的已知結果（例如驗證失敗的資料列），不為 None 的項目不會再查詢或發送
+        """
+        job_id = uuid.uuid4().hex
+        now = datetime.now().isoformat()
+        # 結果已知的項目直接帶入結果，不進入排程
+        results = list(known or [None] * len(dm_list))
+        unknown = [index for index, result in enumerate(results) if result is None]
+        if unknown and self.lookup_many:
+            found = self.lookup_many([dm_list[index] for index in unknown])
+        elif unknown and self.lookup:
+            found = [self.lookup(dm_list[index]) for index in unknown]
+        else:
+            found = []
+        for index, result in zip(unknown, found):
+            results[index] = result
+        with self.lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, error, total, created_at, updated_at, callback_url) "
+                "VALUES (?, ?, NULL, ?, ?, ?, ?)",
+                (job_id, JOB_CREATED, len(dm_list), now, now, callback_url)
+            )
+            conn.executemany(
+                "INSERT INTO job_rows (job_id, seq, row_index, ig_username, payload, state, result, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                ((job_id, seq, json.dumps(dm_item.get('rowIndex')), dm_item.get('igUsername'),
+                  json.dumps(dm_item, ensure_ascii=False), self._row_state(result),
+                  None if result is None else json.dumps(result, ensure_ascii=False), now)
+                 for seq, (dm_item, result) in enumerate(zip(dm_list, results)))
+            )
+        self._release(job_id, [result for result in results if result is not None])
+        self._ensure_worker()
+        known = sum(1 for result in results if result is not None)
+        logger.info(f"📥 已建立任務 {job_id}，共 {len(dm_list)} 個項目" + (f"（{known} 個結果已知，不需發送）" if known else ''))
+        return job_id
+
+    def _release(self, job_id, results):
+        """先通知已知的結果，再讓工作執行緒處理任務：任務的 finished 事件一定在這些結果之後"""
+        for result in results:
+            self._emit(job_id, 'result', result)
+        with self.lock, self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = ? WHERE job_id = ? AND status = ?", (JOB_QUEUED, job_id, JOB_CREATED))
+
+    def get_job(self, job_id):
+        """取得任務進度與結果，找不到時回傳 None"""
+        with self._connect() as conn:
+            job = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+
+            rows = []
+            results = []
+            for row in conn.execute(
+                "SELECT row_index, ig_username, state, result FROM job_rows WHERE job_id = ? ORDER BY seq",
+                (job_id,)
+            ):
+                rows.append({
+                    'rowIndex': json.loads(row['row_index']),
+                    'igUsername': row['ig_username'],
+                    'state': row['state'],
+                    'eta': None
+                })
+                if row['result'] is not None:
+                    results.append(json.loads(row['result']))
+
+            ahead = self._rows_ahead(conn, job) if job['status'] in (JOB_QUEUED, JOB_RUNNING) else None
+
+        # 預估尚未處理項目的發送時間：排在前面的任務與本任務較前面的項目會先佔用發送額度
+        pending = [row for row in rows if row['state'] == ROW_PENDING]
+        eta = None
+        if self.schedule and ahead is not None and pending:
+            now = datetime.now()
+            etas = self.schedule(ahead + len(pending))[ahead:]
+            for row, seconds in zip(pending, etas):
+                row['eta'] = (now + timedelta(seconds=seconds)).isoformat(timespec='seconds')
+            eta = pending[-1]['eta']
+
+        success_count = sum(1 for r in results if r['success'])
+        total_count = len(results)
+
+        return {
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'error': job['error'],
+            'created_at': job['created_at'],
+            'updated_at': job['updated_at'],
+            'eta': eta,
+            'progress': {
+                'total': job['total'],
+                'processed': total_count,
+                'pending': job['total'] - total_count
+            },
+            'rows': rows,
+            'results': results,
+            'summary': {
+                'total': total_count,
+                'success': success_count,
+                'failed': total_count - success_count
+            }
+        }
+
+    def progress(self, job_id):
+        """輕量的任務進度（不載入各項目的結果），找不到時回傳 None"""
+        with self._connect() as conn:
+            job = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            counts = dict(conn.execute(
+                "SELECT state, COUNT(*) FROM job_rows WHERE job_id = ? GROUP BY state", (job_id,)
+            ).fetchall())
+            ahead = self._rows_ahead(conn, job) if job['status'] in (JOB_QUEUED, JOB_RUNNING) else None
+
+        processed = counts.get(ROW_SENT, 0) + counts.get(ROW_FAILED, 0)
+        pending = counts.get(ROW_PENDING, 0)
+        eta = next_eta = None
+        if self.schedule and ahead is not None and pending:
+            now = datetime.now()
+            etas = self.schedule(ahead + pending)[ahead:]
+            next_eta = (now + timedelta(seconds=etas[0])).isoformat(timespec='seconds')
+            eta = (now + timedelta(seconds=etas[-1])).isoformat(timespec='seconds')
+
+        return {
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'error': job['error'],
+            'eta': eta,
+            'next_eta': next_eta,
+            'progress': {
+                'total': job['total'],
+                'processed': processed,
+                'pending': job['total'] - processed
+            }
+        }
+
+    def finished_rows(self, job_id, skip=()):
+        """已有結果的項目 [(seq, result)]，依 seq 排序並略過 skip 中的 seq"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT seq, result FROM job_rows WHERE job_id = ? AND state IN (?, ?) ORDER BY seq",
+                (job_id, ROW_SENT, ROW_FAILED)
+            ).fetchall()
+        return [(row['seq'], json.loads(row['result'])) for row in rows if row['seq'] not in skip]
+
+    def callback_url(self, job_id):
+        """任務建立時指定的結果回呼網址"""
+        if job_id in self.callback_urls:
+            return self.callback_urls[job_id]
+        with self._connect() as conn:
+            row = conn.execute("SELECT callback_url FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        self.callback_urls[job_id] = row['callback_url']
+        return row['callback_url']
+
+    def next_callback_seq(self, job_id):
+        """遞增並回傳任務的回呼批次序號（保存於資料庫，重啟後接續）"""
+        with self.lock, self._connect() as conn:
+            conn.execute("UPDATE jobs SET callback_seq = callback_seq + 1 WHERE job_id = ?", (job_id,))
+            row = conn.execute("SELECT callback_seq FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row['callback_seq'] if row else None
+
+    def _rows_ahead(self, conn, job):
+        """排在此任務之前、尚未處理的項目數（包含正在發送的項目）"""
+        return conn.execute(
+            "SELECT COUNT(*) FROM job_rows r JOIN jobs j ON j.job_id = r.job_id "
+            "WHERE (r.state = ? AND j.status IN (?, ?) AND j.created_at < ?) OR r.state = ?",
+            (ROW_PENDING, JOB_QUEUED, JOB_RUNNING, job['created_at'], ROW_IN_FLIGHT)
+        ).fetchone()[0]
+
+    def queued_count(self):
+        """尚未完成的任務數量"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (JOB_QUEUED, JOB_RUNNING)
+            ).fetchone()[0]
+
+    def pending_rows(self):
+        """尚未處理的項目數量（只計算排隊中與執行中的任務）"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM job_rows r JOIN jobs j ON j.job_id = r.job_id "
+                "WHERE r.state = ? AND j.status IN (?, ?)",
+                (ROW_PENDING, JOB_QUEUED, JOB_RUNNING)
+            ).fetchone()[0]
+
+    def load_state(self, key, default=None):
+        """讀取持久化的狀態值（例如發送計數器）"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM kv_state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row['value']) if row else default
+
+    def save_state(self, key, value):
+        """寫入持久化的狀態值"""
+        with self.lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO kv_state (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, json.dumps(value))
+            )
+
+    def _ensure_worker(self):
+        """確保背景工作執行緒正在運行"""
+        self.wakeup.set()
+        with self.lock:
+            if self.worker and self.worker.is_alive():
+                return
+            self.worker = threading.Thread(target=self._worker_loop, name='dm-job-worker', daemon=True)
+            self.worker.start()
+
+    def _update_job(self, job_id, status, error=None):
+        with self.lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?",
+                (status, error, datetime.now().isoformat(), job_id)
+            )
+        if status in (JOB_COMPLETED, JOB_FAILED):
+            self._emit(job_id, 'finished', {'status': status, 'error': error})
+            self.callback_urls.pop(job_id, None)
+
+    def _update_row(self, job_id, seq, state, result=None):
+        now = datetime.now().isoformat()
+        with self.lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE job_rows SET state = ?, result = ?, updated_at = ? WHERE job_id = ? AND seq = ?",
+                (state, json.dumps(result, ensure_ascii=False) if result is not None else None, now, job_id, seq)
+            )
+            conn.execute("UPDATE jobs SET updated_at = ? WHERE job_id = ?", (now, job_id))
+        if result is not None:
+            self._emit(job_id, 'result', result)
+
+    def _row_state(self, result):
+        if result is None:
+            return ROW_PENDING
+        return ROW_SENT if result['success'] else ROW_FAILED
+
+    def _next_job(self):
+        """取得最早建立且尚未完成的任務"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT job_id FROM jobs WHERE status IN (?, ?) ORDER BY created_at LIMIT 1",
+                (JOB_QUEUED, JOB_RUNNING)
+            ).fetchone()
+        return row['job_id'] if row else None
+
+    def _next_row(self, job_id):
+        """一次只讀取一筆待處理項目，避免大量資料全部載入記憶體"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT seq, payload FROM job_rows WHERE job_id = ? AND state = ? ORDER BY seq LIMIT 1",
+                (job_id, ROW_PENDING)
+            ).fetchone()
+
+    def _worker_loop(self):
+        """背景執行緒：依序處理佇列中的任務"""
+        while True:
+            self.wakeup.clear()
+            job_id = self._next_job()
+            if job_id is None:
+                self.wakeup.wait()
+                continue
+
+            try:
+                self._run_job(job_id)
+            except Exception as e:
+                logger.error(f"❌ 任務 {job_id} 執行失敗: {str(e)}")
+                self._fail_job(job_id, str(e))
+
+    def _fail_job(self, job_id, error):
+        """任務無法繼續：尚未處理的項目逐一標記為失敗（經由一般的結果事件通知），再將任務標記為失敗"""
+        while True:
+            row = self._next_row(job_id)
+            if row is None:
+                break
+            dm_item = json.loads(row['payload'])
+            self._update_row(job_id, row['seq'], ROW_FAILED, {
+                'rowIndex': dm_item.get('rowIndex'),
+                'igUsername': dm_item.get('igUsername'),
+                'success': False,
+                'error': error
+            })
+        self._update_job(job_id, JOB_FAILED, error)
+
+    def _run_job(self, job_id):
+        """處理單一任務中的每一筆資料"""
+        self._update_job(job_id, JOB_RUNNING)
+
+        # 沒有需要發送的項目（空的批次或結果皆已知）時不必啟動瀏覽器
+        if self.prepare and self._next_row(job_id) is not None:
+            ready, error = self.prepare()
+            if not ready:
+                self._fail_job(job_id, error)
+                return
+
+        while True:
+            row = self._next_row(job_id)
+            if row is None:
+                break
+
+            dm_item = json.loads(row['payload'])
+
+            # 重疊的任務可能已送出相同的訊息，或前面的項目已確認該帳號無法發送
+            known = self.lookup(dm_item) if self.lookup else None
+            if known is not None:
+                logger.info(f"略過結果已知的項目 @{dm_item.get('igUsername')}")
+                self._update_row(job_id, row['seq'], self._row_state(known), known)
+                continue
+
+            # 達到發送限制時延後處理：項目維持 pending（重啟後仍會接續），等到最早可發送的時間點
+            if self.throttle:
+                wait, reason = self.throttle()
+                if wait > 0:
+                    logger.info(f"⏳ {reason}，{wait:.0f} 秒後處理下一筆 (任務 {job_id})")
+                    time.sleep(wait)
+                    continue
+
+            self._update_row(job_id, row['seq'], ROW_IN_FLIGHT)
+            try:
+                result = self.handler(dm_item)
+            except JobAborted as e:
+                logger.error(f"❌ 任務 {job_id} 無法繼續: {e.error}")
+                self._update_row(job_id, row['seq'], ROW_FAILED, e.result)
+                self._fail_job(job_id, e.error)
+                return
+            except Exception as e:
+                logger.error(f"處理 @{dm_item.get('igUsername')} 時發生錯誤: {str(e)}")
+                result = {
+                    'rowIndex': dm_item.get('rowIndex'),
+                    'igUsername': dm_item.get('igUsername'),
+                    'success': False,
+                    'error': str(e)
+                }
+            self._update_row(job_id, row['seq'], self._row_state(result), result)
+
+        summary = self.get_job(job_id)['summary']
+        logger.info(f"DM 發送完成: {summary['success']}/{summary['total']} 成功 (任務 {job_id})")
+        self._update_job(job_id, JOB_COMPLETED)
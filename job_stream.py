@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+任務進度串流
+把任務佇列的進度轉成逐筆的 JSON 記錄：每一列完成時輸出一筆 result，等待下一次發送期間定期輸出 heartbeat（含 ETA），
+任務結束時輸出 finished。結果每次都從資料庫讀取新完成的項目，不在記憶體中累積整批結果
+"""
+
+import json
+import threading
+from datetime import datetime
+
+from job_queue import JOB_COMPLETED, JOB_FAILED
+
+EVENT_START = 'start'
+EVENT_RESULT = 'result'
+EVENT_HEARTBEAT = 'heartbeat'
+EVENT_FINISHED = 'finished'
+
+
+class JobStream(object):
+    """
+    訂閱任務佇列的事件，任何任務有新結果時喚醒等待中的串流
+
+    heartbeat: 沒有新結果時，每隔幾秒輸出一次 heartbeat
+    """
+
+    def __init__(self, job_queue, heartbeat=15):
+        self.job_queue = job_queue
+        self.heartbeat = heartbeat
+        self.condition = threading.Condition()
+        self.generation = 0
+        job_queue.subscribe(self._on_event)
+
+    def _on_event(self, job_id, event, data):
+        with self.condition:
+            self.generation += 1
+            self.condition.notify_all()
+
+    def _wait(self, generation):
+        """等待新事件，回傳是否在 heartbeat 秒內有事件發生"""
+        with self.condition:
+            if self.generation == generation:
+                self.condition.wait(self.heartbeat)
+            return self.generation != generation
+
+    def records(self, job_id):
+        """任務的進度記錄；任務不存在時回傳 None"""
+        progress = self.job_queue.progress(job_id)
+        if progress is None:
+            return None
+        return self._records(job_id, progress)
+
+    def _records(self, job_id, progress):
+        seen = set()
+        summary = {'total': 0, 'success': 0, 'failed': 0}
+        yield self._record(EVENT_START, progress)
+
+        while True:
+            generation = self.generation
+            # 先讀取狀態再讀取結果：任務結束前的所有結果一定會在這次讀到
+            progress = self.job_queue.progress(job_id)
+            for seq, result in self.job_queue.finished_rows(job_id, skip=seen):
+                seen.add(seq)
+                summary['total'] += 1
+                summary['success' if result['success'] else 'failed'] += 1
+                yield dict(event=EVENT_RESULT, seq=seq, **result)
+
+            if progress['status'] in (JOB_COMPLETED, JOB_FAILED):
+                yield dict(self._record(EVENT_FINISHED, progress), summary=summary)
+                return
+
+            if not self._wait(generation):
+                yield self._record(EVENT_HEARTBEAT, self.job_queue.progress(job_id))
+
+    def _record(self, event, progress):
+        return dict(progress, event=event, timestamp=datetime.now().isoformat(timespec='seconds'))
+
+
+def ndjson(records):
+    """每筆記錄一行 JSON"""
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def server_sent_events(records):
+    """Server-Sent Events 格式，event 名稱即記錄的 event 欄位"""
+    for record in records:
+        yield f"event: {record['event']}\ndata: {json.dumps(record, ensure_ascii=False)}\n\n"
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+個人頁面分類
+以一次 execute_script 在頁面內判斷帳號狀態（不存在 / 私人帳號 / 需追蹤 / 可傳訊息），
+同時找出訊息按鈕，避免多次透過 page_source 傳回整份 DOM
+"""
+
+import time
+
+# 頁面分類結果
+PAGE_LOADING = 'loading'
+PAGE_NOT_FOUND = 'not_found'
+PAGE_PRIVATE = 'private'
+PAGE_FOLLOW_REQUIRED = 'follow_required'
+PAGE_MESSAGEABLE = 'messageable'
+PAGE_UNKNOWN = 'unknown'
+
+# 各分類在頁面上出現的文字（英文 / 中文介面）
+PAGE_MARKERS = {
+    PAGE_NOT_FOUND: ["Sorry, this page isn't available", "很抱歉，此頁面無法使用"],
+    PAGE_FOLLOW_REQUIRED: ["Follow to message", "追蹤以傳送訊息"],
+    PAGE_PRIVATE: ["This Account is Private", "This account is private", "這是私人帳號"],
+}
+
+# arguments[0]: 訊息按鈕候選 XPath；arguments[1]: 各分類的標記文字；
+# arguments[2]: 前幾個為明確的訊息按鈕選擇器，其餘為寬鬆的備援選擇器（側邊欄的訊息連結在每個頁面都會命中），
+# 備援選擇器只在頁面沒有私人帳號 / 需追蹤的標記時才採用，命中時仍回報 unknown（附上元素），
+# 由 profile_classified 等頁面穩定後仍無法分類時才當作訊息按鈕
+CLASSIFY_SCRIPT = """
+var xpaths = arguments[0];
+var markers = arguments[1];
+var primary = arguments[2];
+var body = document.body;
+if (!body) return {status: 'loading'};
+var text = body.innerText || '';
+function has(list) {
+    for (var i = 0; i < list.length; i++) {
+        if (text.indexOf(list[i]) !== -1) return true;
+    }
+    return false;
+}
+function find(start, end) {
+    for (var i = start; i < end; i++) {
+        var result;
+        try {
+            result = document.evaluate(xpaths[i], document, null,
+                                       XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        } catch (e) {
+            continue;
+        }
+        for (var j = 0; j < result.snapshotLength; j++) {
+            var el = result.snapshotItem(j);
+            if (el.getClientRects().length > 0 && !el.disabled && el.getAttribute('aria-disabled') !== 'true') {
+                return {status: 'messageable', index: i, button: el};
+            }
+        }
+    }
+    return null;
+}
+if (has(markers.not_found)) return {status: 'not_found'};
+var found = find(0, primary);
+if (found) return found;
+if (has(markers.follow_required)) return {status: 'follow_required'};
+if (has(markers.private)) return {status: 'private'};
+if (!document.querySelector('main') || document.readyState !== 'complete') return {status: 'loading'};
+found = find(primary, xpaths.length);
+if (found) return {status: 'unknown', index: found.index, button: found.button};
+return {status: 'unknown'};
+"""
+
+
+class profile_classified(object):
+    """
+    等待個人頁面可被分類，回傳 {'status', 'button', 'selector'}
+    頁面載入完成後若 settle_time 秒內仍無法分類，回傳 unknown
+    訊息按鈕的命中結果會記錄到對應的選擇器階梯統計
+    """
+
+    def __init__(self, ladder, settle_time):
+        self.ladder = ladder
+        self.settle_time = settle_time
+        self.ordered = ladder.ordered()
+        self.start = time.monotonic()
+        self.unknown_since = None
+        self.last = {'status': PAGE_LOADING, 'button': None, 'selector': None}
+
+    def __call__(self, driver):
+        primary = len(self.ordered) - len(self.ladder.fallbacks)
+        probe = driver.execute_script(CLASSIFY_SCRIPT, self.ordered, PAGE_MARKERS, primary) or {}
+        status = probe.get('status', PAGE_LOADING)
+        selector = self.ordered[probe['index']] if status == PAGE_MESSAGEABLE else None
+        self.last = {'status': status, 'button': probe.get('button') if selector else None, 'selector': selector}
+
+        if status == PAGE_LOADING:
+            return False
+
+        if status == PAGE_UNKNOWN:
+            now = time.monotonic()
+            if self.unknown_since is None:
+                self.unknown_since = now
+            if now - self.unknown_since < self.settle_time:
+                return False
+            if probe.get('button') is not None:
+                # 明確的選擇器與分類標記都沒有出現，才採用備援選擇器
+                self.last = {'status': PAGE_MESSAGEABLE, 'button': probe['button'],
+                             'selector': self.ordered[probe['index']]}
+                self.ladder.record(self.ordered, self.last['selector'], now - self.start)
+                return self.last
+            self.ladder.record(self.ordered, None, now - self.start)
+            return self.last
+
+        if status == PAGE_MESSAGEABLE:
+            self.ladder.record(self.ordered, selector, time.monotonic() - self.start)
+        return self.last
+
+    def finish(self):
+        """等待逾時時呼叫：回傳最後一次的分類結果並記錄選擇器未命中"""
+        self.ladder.record(self.ordered, None, time.monotonic() - self.start)
+        if self.last['status'] == PAGE_LOADING:
+            self.last['status'] = PAGE_UNKNOWN
+        return self.last
+
+
+# 登入狀態判斷
+SESSION_LOGGED_IN = 'logged_in'
+SESSION_LOGGED_OUT = 'logged_out'
+
+SESSION_SCRIPT = """
+if (location.pathname.indexOf('/accounts/login') === 0) return 'logged_out';
+if (document.querySelector("input[name='username']")) return 'logged_out';
+if (document.querySelector("a[href*='/direct/inbox'], svg[aria-label='Home'], svg[aria-label='首頁']")) return 'logged_in';
+return null;
+"""
+
+
+# 不導覽頁面的登入狀態確認：在目前頁面以 fetch 請求需要登入的網址，被導向登入頁代表會話已失效
+# 目前頁面不是同一個網域、逾時或其他狀態碼時回傳 null（無法判斷）
+SESSION_FETCH_SCRIPT = """
+var url = arguments[0], timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+if (location.origin !== new URL(url).origin) { done(null); return; }
+var controller = new AbortController();
+setTimeout(function () { controller.abort(); }, timeoutMs);
+fetch(url, {credentials: 'include', redirect: 'manual', signal: controller.signal}).then(function (response) {
+    if (response.type === 'opaqueredirect') done('logged_out');
+    else if (response.ok) done('logged_in');
+    else done(null);
+}).catch(function () { done(null); });
+"""
+
+
+class session_checked(object):
+    """等待頁面顯示出登入或未登入的狀態，回傳 logged_in / logged_out"""
+
+    def __call__(self, driver):
+        return driver.execute_script(SESSION_SCRIPT) or False
+
+
+# 導覽統計：傳輸位元組數、資源數量與頁面就緒時間（毫秒）
+# 跨網域資源若未提供 Timing-Allow-Origin，transferSize 會是 0，數值為下限
+NAVIGATION_STATS_SCRIPT = """
+var nav = performance.getEntriesByType('navigation')[0];
+var resources = performance.getEntriesByType('resource');
+var bytes = nav ? (nav.transferSize || 0) : 0;
+for (var i = 0; i < resources.length; i++) bytes += resources[i].transferSize || 0;
+return {
+    transfer_bytes: bytes,
+    resources: resources.length,
+    dom_ready_ms: nav ? Math.round(nav.domContentLoadedEventEnd) : null,
+    load_ms: nav ? Math.round(nav.loadEventEnd) : null
+};
+"""
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+從 /proc 讀取行程記憶體用量（僅 Linux；其他平台回傳 None）
+用於計算 chromedriver 與其所有 Chrome 子行程的總 RSS
+"""
+
+import os
+
+
+def _children(pid):
+    """回傳指定行程的直接子行程 pid"""
+    children = []
+    task_dir = f'/proc/{pid}/task'
+    try:
+        tasks = os.listdir(task_dir)
+    except OSError:
+        return children
+    for tid in tasks:
+        try:
+            with open(f'{task_dir}/{tid}/children') as f:
+                children.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return children
+
+
+def _rss_kb(pid):
+    """讀取 /proc/<pid>/status 的 VmRSS（KB）"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def process_tree_rss_mb(pid):
+    """計算行程及所有子孫行程的 RSS 總和（MB），無法讀取時回傳 None"""
+    if not pid or not os.path.exists(f'/proc/{pid}'):
+        return None
+
+    total_kb = 0
+    seen = set()
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        total_kb += _rss_kb(current)
+        stack.extend(_children(current))
+
+    return round(total_kb / 1024, 1)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+發送限制
+以滾動視窗計算每小時 / 每日發送數量與發送間隔，並回傳距離下一次允許發送的精確秒數
+每次發送後在 min_interval ~ max_interval 之間隨機決定與下一次發送的間隔（避免固定節奏被偵測），
+由任務佇列在處理下一筆前等待，發送結果不必等到間隔結束才回報
+程式內以 time.monotonic() 計算（不受系統時間調整影響），持久化時換算為實際時間，重啟後不會歸零
+"""
+
+import time
+import random
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+DAY = 86400
+
+# 限制原因
+LIMIT_INTERVAL = 'min_interval'
+LIMIT_HOURLY = 'hourly_limit'
+LIMIT_DAILY = 'daily_limit'
+
+LIMIT_MESSAGES = {
+    LIMIT_INTERVAL: '發送間隔太短',
+    LIMIT_HOURLY: '已達每小時發送限制',
+    LIMIT_DAILY: '已達每日發送限制',
+}
+
+
+class RateLimiter(object):
+    """
+    滾動視窗發送限制
+
+    max_interval: 發送間隔的上限，每次發送後在 min_interval ~ max_interval 之間隨機取值；為 None 時固定為 min_interval
+    store: 提供 load_state(key) / save_state(key, value) 的物件（例如 JobQueue），為 None 時不持久化
+    """
+
+    def __init__(self, daily_limit, hourly_limit, min_interval, max_interval=None, store=None, key='rate_limiter'):
+        self.daily_limit = daily_limit
+        self.hourly_limit = hourly_limit
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.store = store
+        self.key = key
+        self.lock = threading.Lock()
+        self.sends = deque()  # 過去 24 小時內每次發送的 monotonic 時間
+        self.interval = min_interval  # 最後一次發送與下一次發送之間的間隔
+        self._load()
+
+    def check(self):
+        """回傳 (需等待秒數, 限制原因)；可立即發送時回傳 (0, None)"""
+        with self.lock:
+            now = time.monotonic()
+            self._trim(now)
+            return self._wait_at(self.sends, now, self.interval)
+
+    def schedule(self, count, pace=0):
+        """
+        預估接下來 count 次發送距離現在的秒數
+        pace 為每次發送後至少經過的秒數（發送耗時與隨機間隔的平均），實際時間點仍受各項限制約束
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._trim(now)
+            sends = deque(self.sends)
+            interval = self.interval
+
+        etas = []
+        at = now
+        for _ in range(count):
+            while sends and sends[0] <= at - DAY:
+                sends.popleft()
+            at += self._wait_at(sends, at, interval)[0]
+            etas.append(at - now)
+            sends.append(at)
+            at += pace
+            # 之後的間隔尚未決定，以 pace 估計，這裡只套用最短間隔
+            interval = self.min_interval
+        return etas
+
+    def _wait_at(self, sends, now, interval):
+        """在時間點 now 時，依 sends（已排序、24 小時內）與最後一次發送後的間隔計算需等待的秒數與原因"""
+        waits = []
+
+        if self.daily_limit is not None and len(sends) >= self.daily_limit:
+            # 最早的一筆離開 24 小時視窗後才能再發送
+            waits.append((self._oldest_counted(sends, self.daily_limit, now) + DAY - now, LIMIT_DAILY))
+
+        hourly = self._count_since(sends, now - HOUR)
+        if self.hourly_limit is not None and hourly >= self.hourly_limit:
+            waits.append((self._oldest_counted(sends, self.hourly_limit, now) + HOUR - now, LIMIT_HOURLY))
+
+        if sends and interval:
+            waits.append((sends[-1] + interval - now, LIMIT_INTERVAL))
+
+        waits = [(wait, reason) for wait, reason in waits if wait > 0]
+        if not waits:
+            return 0, None
+        return max(waits)
+
+    def record(self):
+        """記錄一次成功發送，決定與下一次發送的間隔並寫入儲存"""
+        with self.lock:
+            now = time.monotonic()
+            self.sends.append(now)
+            self.interval = self._next_interval()
+            self._trim(now)
+            self._save()
+        logger.info(f"下一次發送至少間隔 {self.interval} 秒")
+
+    def _next_interval(self):
+        if self.max_interval is None or self.max_interval <= self.min_interval:
+            return self.min_interval
+        return random.randint(self.min_interval, self.max_interval)
+
+    def counts(self):
+        """過去一小時與過去 24 小時的發送數量"""
+        with self.lock:
+            now = time.monotonic()
+            self._trim(now)
+            return {
+                'hourly': self._count_since(self.sends, now - HOUR),
+                'daily': len(self.sends)
+            }
+
+    def _oldest_counted(self, sends, limit, now):
+        """視窗內必須移出的最後一筆發送時間；上限為 0 時視為現在才發送"""
+        index = len(sends) - limit
+        return sends[index] if index < len(sends) else now
+
+    def _count_since(self, sends, since):
+        count = 0
+        for sent_at in reversed(sends):
+            if sent_at <= since:
+                break
+            count += 1
+        return count
+
+    def _trim(self, now):
+        while self.sends and self.sends[0] <= now - DAY:
+            self.sends.popleft()
+
+    def _load(self):
+        if self.store is None:
+            return
+        state = self.store.load_state(self.key)
+        if not state:
+            return
+
+        # 實際時間 → monotonic：以目前兩個時鐘的差距換算
+        offset = time.monotonic() - time.time()
+        self.sends = deque(sorted(sent_at + offset for sent_at in state.get('sends', [])))
+        self.interval = state.get('interval', self.min_interval)
+        self._trim(time.monotonic())
+        logger.info(f"已還原發送紀錄: 過去 24 小時 {len(self.sends)} 則")
+
+    def _save(self):
+        if self.store is None:
+            return
+        offset = time.time() - time.monotonic()
+        self.store.save_state(self.key, {
+            'sends': [round(sent_at + offset, 3) for sent_at in self.sends],
+            'interval': self.interval
+        })
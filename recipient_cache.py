@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+收件人狀態快取
+記錄帳號最近一次的頁面分類結果（不存在 / 私人帳號 / 需追蹤），在有效期間內再次出現時直接回報，
+不必重新開啟個人頁面
+"""
+
+import time
+from datetime import datetime
+
+from job_queue import connect
+
+# 一次 IN (...) 查詢的帳號數上限（SQLite 的參數數量限制）
+LOOKUP_CHUNK = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recipient_status (
+    ig_username TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    checked_at REAL NOT NULL
+);
+"""
+
+
+def normalize_username(username):
+    return str(username or '').strip().lower()
+
+
+class RecipientCache(object):
+    """
+    持久化的收件人狀態快取（與任務佇列共用 SQLite）
+
+    ttls: {狀態: 有效秒數}，只快取有設定且大於 0 的狀態
+    """
+
+    def __init__(self, db_path, ttls):
+        self.db_path = db_path
+        self.ttls = dict((status, ttl) for status, ttl in ttls.items() if ttl > 0)
+        with connect(self.db_path) as conn:
+            conn.executescript(SCHEMA)
+
+    def get(self, username):
+        """回傳仍在有效期間內的 {'status', 'checked_at'}，否則回傳 None"""
+        return self.get_many([username])[0]
+
+    def get_many(self, usernames):
+        """以一次連線查詢多個帳號，回傳與 usernames 對應的結果"""
+        names = [normalize_username(username) for username in usernames]
+        unique = list(set(names))
+        rows = {}
+        if unique:
+            with connect(self.db_path) as conn:
+                for start in range(0, len(unique), LOOKUP_CHUNK):
+                    chunk = unique[start:start + LOOKUP_CHUNK]
+                    for row in conn.execute(
+                        "SELECT ig_username, status, checked_at FROM recipient_status "
+                        f"WHERE ig_username IN ({','.join('?' * len(chunk))})", chunk
+                    ):
+                        rows[row['ig_username']] = row
+        return [self._entry(rows.get(name)) for name in names]
+
+    def _entry(self, row):
+        if row is None:
+            return None
+
+        ttl = self.ttls.get(row['status'])
+        if not ttl or row['checked_at'] < time.time() - ttl:
+            return None
+        return {
+            'status': row['status'],
+            'checked_at': datetime.fromtimestamp(row['checked_at']).isoformat(timespec='seconds')
+        }
+
+    def record(self, username, status):
+        """記錄分類結果；不需快取的狀態會清除舊記錄"""
+        if status not in self.ttls:
+            self.forget(username)
+            return
+        with connect(self.db_path) as conn:
+            conn.execute(
+                "INSERT INTO recipient_status (ig_username, status, checked_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(ig_username) DO UPDATE SET status = excluded.status, checked_at = excluded.checked_at",
+                (normalize_username(username), status, time.time())
+            )
+
+    def forget(self, username):
+        with connect(self.db_path) as conn:
+            conn.execute("DELETE FROM recipient_status WHERE ig_username = ?", (normalize_username(username),))
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+選擇器階梯（Selector Ladder）
+一組依序嘗試的 XPath 候選，一次注入 JavaScript 在頁面內同時比對所有候選，
+並記住上次命中的選擇器優先嘗試，同時統計每個選擇器的命中 / 未命中 / 延遲
+"""
+
+import time
+import threading
+from datetime import datetime
+
+# 在頁面內依序比對所有 XPath，回傳 [命中的索引, 元素]；全部未命中時回傳 null
+PROBE_SCRIPT = """
+var xpaths = arguments[0];
+var clickable = arguments[1];
+for (var i = 0; i < xpaths.length; i++) {
+    var result;
+    try {
+        result = document.evaluate(xpaths[i], document, null,
+                                   XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    } catch (e) {
+        continue;
+    }
+    for (var j = 0; j < result.snapshotLength; j++) {
+        var el = result.snapshotItem(j);
+        if (!clickable) return [i, el];
+        var visible = el.getClientRects().length > 0;
+        if (visible && !el.disabled && el.getAttribute('aria-disabled') !== 'true') return [i, el];
+    }
+}
+return null;
+"""
+
+
+class SelectorLadder(object):
+    """
+    可學習順序的選擇器候選清單
+
+    fallbacks: 寬鬆的備援選擇器（例如任何 /direct/ 連結），永遠排在最後且不會因命中而提前，
+    避免一次誤中後每個頁面都優先點到錯誤的元素
+    """
+
+    def __init__(self, name, selectors, clickable=True, fallbacks=()):
+        self.name = name
+        self.selectors = list(selectors)
+        self.fallbacks = list(fallbacks)
+        self.clickable = clickable
+        self.last_hit = None
+        self.lock = threading.Lock()
+        self.stats = dict((selector, {
+            'hits': 0,
+            'misses': 0,
+            'latency_total': 0.0,
+            'last_hit_at': None
+        }) for selector in self.selectors + self.fallbacks)
+
+    def ordered(self):
+        """目前的嘗試順序：上次命中者優先，其餘依命中次數排序，同分保持原順序；備援選擇器固定依原順序排在最後"""
+        with self.lock:
+            position = dict((selector, i) for i, selector in enumerate(self.selectors))
+            ordered = sorted(self.selectors, key=lambda s: (-self.stats[s]['hits'], position[s]))
+            if self.last_hit in ordered:
+                ordered.remove(self.last_hit)
+                ordered.insert(0, self.last_hit)
+            return ordered + self.fallbacks
+
+    def probe(self, driver, ordered=None):
+        """單次 JavaScript 呼叫比對所有候選，回傳 (選擇器, 元素) 或 (None, None)"""
+        ordered = ordered or self.ordered()
+        match = driver.execute_script(PROBE_SCRIPT, ordered, self.clickable)
+        if not match:
+            return None, None
+        return ordered[match[0]], match[1]
+
+    def resolve(self, driver, timeout, poll_frequency=0.2, params=None):
+        """
+        等待任一候選出現並回傳該元素，逾時則拋出 TimeoutException
+        params: 代入選擇器樣板的參數（例如 {'username': ...}），統計仍以樣板為單位
+        命中的選擇器記為 hit，排在它前面的候選記為 miss；逾時則全部記為 miss
+        """
+        # 只在實際解析時才載入 Selenium，定義階梯的模組匯入時不需要它
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.common.exceptions import TimeoutException
+
+        ordered = self.ordered()
+        xpaths = [selector.format(**params) for selector in ordered] if params else ordered
+        start = time.monotonic()
+        found = {}
+
+        def condition(d):
+            match = d.execute_script(PROBE_SCRIPT, xpaths, self.clickable)
+            if not match:
+                return False
+            found['selector'] = ordered[match[0]]
+            return match[1]
+
+        try:
+            element = WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(condition)
+        except TimeoutException:
+            self.record(ordered, None, time.monotonic() - start)
+            raise TimeoutException(f"選擇器階梯 '{self.name}' 在 {timeout} 秒內沒有任何候選命中")
+
+        self.record(ordered, found['selector'], time.monotonic() - start)
+        return element
+
+    def record(self, ordered, hit, elapsed):
+        """記錄一次解析結果：命中者記為 hit，排在前面的候選記為 miss"""
+        with self.lock:
+            for selector in ordered:
+                if selector == hit:
+                    stat = self.stats[selector]
+                    stat['hits'] += 1
+                    stat['latency_total'] += elapsed
+                    stat['last_hit_at'] = datetime.now().isoformat()
+                    if selector not in self.fallbacks:
+                        self.last_hit = selector
+                    break
+                self.stats[selector]['misses'] += 1
+
+    def snapshot(self):
+        """回傳目前的嘗試順序與每個選擇器的統計"""
+        ordered = self.ordered()
+        with self.lock:
+            return {
+                'name': self.name,
+                'last_hit': self.last_hit,
+                'selectors': [{
+                    'selector': selector,
+                    'hits': self.stats[selector]['hits'],
+                    'misses': self.stats[selector]['misses'],
+                    'avg_latency_ms': round(
+                        self.stats[selector]['latency_total'] / self.stats[selector]['hits'] * 1000, 1
+                    ) if self.stats[selector]['hits'] else None,
+                    'last_hit_at': self.stats[selector]['last_hit_at']
+                } for selector in ordered]
+            }
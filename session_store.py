@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+登入會話保存
+將登入後的 Instagram cookies 寫入磁碟，服務重啟時直接還原，不必重新登入
+"""
+
+import os
+import json
+import time
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# 判斷登入狀態所需的 cookie
+SESSION_COOKIE = 'sessionid'
+
+
+class SessionStore(object):
+    """以 JSON 檔案保存單一帳號的 cookies"""
+
+    def __init__(self, path, username):
+        self.path = path
+        self.username = username
+
+    def save(self, cookies):
+        """保存 cookies（檔案權限 600，避免其他使用者讀取）"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        data = {
+            'username': self.username,
+            'saved_at': datetime.now().isoformat(),
+            'cookies': cookies
+        }
+        tmp_path = self.path + '.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+        logger.info(f"💾 已保存登入會話 ({len(cookies)} 個 cookies)")
+
+    def load(self):
+        """讀取仍有效的 cookies；檔案不存在、帳號不符或 sessionid 已過期時回傳 None"""
+        if not os.path.exists(self.path):
+            return None
+
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"讀取登入會話失敗: {str(e)}")
+            return None
+
+        if data.get('username') != self.username:
+            logger.info("保存的登入會話屬於其他帳號，略過")
+            return None
+
+        cookies = data.get('cookies') or []
+        session = next((c for c in cookies if c.get('name') == SESSION_COOKIE), None)
+        if session is None:
+            return None
+        if session.get('expiry') and session['expiry'] <= time.time():
+            logger.info("保存的登入會話已過期")
+            return None
+
+        return cookies
+
+    def clear(self):
+        """刪除保存的會話（會話被 Instagram 拒絕時呼叫）"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Google Sheets 結果回寫
+將每一列的發送結果（狀態、錯誤訊息、時間）暫存起來，達到筆數或時間門檻時以單一 batch_update 寫回試算表，
+500 列的結果只需要少數幾次 API 呼叫；gspread 只在實際啟用時才載入
+"""
+
+import time
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+STATUS_SENT = '已發送'
+STATUS_FAILED = '發送失敗'
+# 背景寫入失敗後，等待幾秒再重試（避免 API 配額用盡時持續呼叫）
+RETRY_DELAY = 30
+
+
+def column_number(letters):
+    """'A' -> 1, 'H' -> 8, 'AA' -> 27"""
+    number = 0
+    for char in letters.upper():
+        number = number * 26 + ord(char) - ord('A') + 1
+    return number
+
+
+def column_letters(number):
+    """1 -> 'A', 27 -> 'AA'"""
+    letters = ''
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+class GspreadSink(object):
+    """以 gspread 寫入試算表：每次 write() 只呼叫一次 batch_update"""
+
+    def __init__(self, credentials_file, sheet_id, worksheet=None, start_column='H'):
+        self.credentials_file = credentials_file
+        self.sheet_id = sheet_id
+        self.worksheet_name = worksheet
+        self.start_column = start_column
+        self.end_column = column_letters(column_number(start_column) + 2)
+        self.worksheet = None
+
+    def _open(self):
+        if self.worksheet is None:
+            import gspread
+            from oauth2client.service_account import ServiceAccountCredentials
+
+            scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+            credentials = ServiceAccountCredentials.from_json_keyfile_name(self.credentials_file, scope)
+            spreadsheet = gspread.authorize(credentials).open_by_key(self.sheet_id)
+            self.worksheet = (spreadsheet.worksheet(self.worksheet_name) if self.worksheet_name
+                              else spreadsheet.sheet1)
+        return self.worksheet
+
+    def write(self, updates):
+        """updates: [(row_index, [狀態, 錯誤, 時間])]"""
+        self._open().batch_update([
+            {'range': f'{self.start_column}{row}:{self.end_column}{row}', 'values': [values]}
+            for row, values in updates
+        ])
+
+
+class MemorySink(object):
+    """本地替代品：記錄每次批次寫入，用於測試與未設定 Google 憑證的環境"""
+
+    def __init__(self):
+        self.batches = []
+        self.cells = {}
+
+    def write(self, updates):
+        self.batches.append(list(updates))
+        for row, values in updates:
+            self.cells[row] = values
+
+
+class SheetWriter(object):
+    """
+    暫存結果並批次寫回
+
+    batch_size: 累積幾筆就寫入
+    flush_interval: 最早的一筆等待超過幾秒就寫入；0 表示只在累積滿 batch_size 或呼叫 flush() / request_flush() 時寫入
+    """
+
+    def __init__(self, sink, batch_size=50, flush_interval=0):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.condition = threading.Condition()
+        self.pending = {}  # row_index -> values（同一列只保留最新結果）
+        self.first_at = None
+        self.flush_requested = False
+        self.thread = None
+        self.stats = {'writes': 0, 'rows': 0, 'errors': 0}
+
+    def add(self, result):
+        """加入一筆發送結果"""
+        row = result.get('rowIndex')
+        if not isinstance(row, int) or row < 1:
+            return
+
+        values = [
+            STATUS_SENT if result['success'] else STATUS_FAILED,
+            result.get('error') or '',
+            datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        ]
+        with self.condition:
+            self.pending[row] = values
+            if self.first_at is None:
+                self.first_at = time.monotonic()
+            if len(self.pending) >= self.batch_size:
+                self.condition.notify()
+        self._ensure_thread()
+
+    def request_flush(self):
+        """要求背景執行緒盡快寫入所有暫存的結果，不等待 API 呼叫完成（例如任務結束時）"""
+        with self.condition:
+            if not self.pending:
+                return
+            self.flush_requested = True
+            self.condition.notify()
+        self._ensure_thread()
+
+    def flush(self):
+        """立即寫入所有暫存的結果，回傳是否成功"""
+        with self.condition:
+            if not self.pending:
+                return True
+            updates = sorted(self.pending.items())
+            self.pending = {}
+            self.first_at = None
+
+        try:
+            self.sink.write(updates)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"❌ 回寫試算表失敗（{len(updates)} 列，下次寫入時重試）: {str(e)}")
+            with self.condition:
+                # 寫入失敗的列放回暫存；期間若有較新的結果則保留較新的
+                for row, values in updates:
+                    self.pending.setdefault(row, values)
+                if self.first_at is None:
+                    self.first_at = time.monotonic()
+            return False
+
+        self.stats['writes'] += 1
+        self.stats['rows'] += len(updates)
+        logger.info(f"📝 已回寫 {len(updates)} 列結果到試算表")
+        return True
+
+    def _ensure_thread(self):
+        with self.condition:
+            if self.thread and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._loop, name='sheet-writer', daemon=True)
+            self.thread.start()
+
+    def _due(self):
+        if not self.pending:
+            return False
+        return (self.flush_requested or len(self.pending) >= self.batch_size
+                or (self.flush_interval and time.monotonic() - self.first_at >= self.flush_interval))
+
+    def _loop(self):
+        while True:
+            with self.condition:
+                if not self._due():
+                    timeout = None
+                    if self.pending and self.flush_interval:
+                        timeout = max(0.05, self.first_at + self.flush_interval - time.monotonic())
+                    self.condition.wait(timeout)
+                    continue
+                self.flush_requested = False
+            if not self.flush():
+                time.sleep(RETRY_DELAY)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+任務佇列測試：重啟後接續未完成的任務、中斷項目標記為失敗並通知 listener、無法開始的任務
+執行: python -m pytest tests 或 python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_queue import (JobQueue, JobAborted, connect, JOB_CREATED, JOB_QUEUED, JOB_COMPLETED, JOB_FAILED,
+                       ROW_IN_FLIGHT, ROW_PENDING, ROW_SENT, ROW_FAILED)
+
+
+def rows(count):
+    return [{'rowIndex': row, 'igUsername': f'user{row}', 'dmContent': 'x'} for row in range(2, count + 2)]
+
+
+def sent(dm_item):
+    return {'rowIndex': dm_item['rowIndex'], 'igUsername': dm_item['igUsername'], 'success': True, 'error': None}
+
+
+class Recorder(object):
+    """記錄任務事件，並可等待 finished"""
+
+    def __init__(self, job_queue):
+        self.events = []
+        self.finished = threading.Event()
+        job_queue.subscribe(self)
+
+    def __call__(self, job_id, event, data):
+        self.events.append((event, data))
+        if event == 'finished':
+            self.finished.set()
+
+    def results(self):
+        return [data for event, data in self.events if event == 'result']
+
+
+class JobQueueTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        # 工作執行緒在 finished 事件後還會再查詢一次下一個任務，等它閒置後再刪除資料庫
+        time.sleep(0.2)
+        shutil.rmtree(cls.directory, True)
+
+    def setUp(self):
+        self.db_path = os.path.join(self.directory, f'{self._testMethodName}.db')
+
+    def queue(self, handler=sent, **kwargs):
+        return JobQueue(handler, db_path=self.db_path, **kwargs)
+
+    def interrupted_job(self, count=3, in_flight=1):
+        """模擬重啟前的狀態：任務執行中，前 in_flight 筆正在發送，其餘尚未處理"""
+        job_queue = self.queue()
+        job_queue._ensure_worker = lambda: None
+        job_id = job_queue.submit(rows(count))
+        with connect(self.db_path) as conn:
+            conn.execute("UPDATE jobs SET status = 'running' WHERE job_id = ?", (job_id,))
+            conn.execute("UPDATE job_rows SET state = ? WHERE job_id = ? AND seq < ?", (ROW_IN_FLIGHT, job_id, in_flight))
+        return job_id
+
+    def test_completes_job(self):
+        job_queue = self.queue()
+        recorder = Recorder(job_queue)
+        job_id = job_queue.submit(rows(3))
+        self.assertTrue(recorder.finished.wait(5))
+        job = job_queue.get_job(job_id)
+        self.assertEqual(job['status'], JOB_COMPLETED)
+        self.assertEqual(job['summary'], {'total': 3, 'success': 3, 'failed': 0})
+        self.assertEqual(recorder.events[-1], ('finished', {'status': JOB_COMPLETED, 'error': None}))
+
+    def test_restart_fails_in_flight_rows_and_resumes_pending(self):
+        job_id = self.interrupted_job(count=3, in_flight=1)
+
+        handled = []
+        job_queue = self.queue(handler=lambda dm_item: handled.append(dm_item['rowIndex']) or sent(dm_item))
+        recorder = Recorder(job_queue)
+        job_queue.start()
+        self.assertTrue(recorder.finished.wait(5))
+
+        # 中斷時正在發送的項目不重送，並經由一般的結果事件通知
+        self.assertEqual(handled, [3, 4])
+        results = recorder.results()
+        self.assertEqual(results[0]['rowIndex'], 2)
+        self.assertFalse(results[0]['success'])
+        self.assertIn('無法確認', results[0]['error'])
+        job = job_queue.get_job(job_id)
+        self.assertEqual([row['state'] for row in job['rows']], [ROW_FAILED, ROW_SENT, ROW_SENT])
+        self.assertEqual(job['status'], JOB_COMPLETED)
+
+    def test_recovery_waits_for_start(self):
+        self.interrupted_job()
+        job_queue = self.queue()
+        recorder = Recorder(job_queue)
+        # 建立佇列時不處理，listener 註冊後由 start() 處理，才不會漏掉通知
+        with connect(self.db_path) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM job_rows WHERE state = ?", (ROW_IN_FLIGHT,)).fetchone()[0], 1)
+        job_queue.start()
+        self.assertTrue(recorder.finished.wait(5))
+        self.assertEqual(len(recorder.results()), 3)
+
+    def test_restart_releases_created_job(self):
+        job_queue = self.queue()
+        job_queue._ensure_worker = lambda: None
+        known = [{'rowIndex': 2, 'igUsername': 'user2', 'success': False, 'error': 'invalid'}, None]
+        job_id = job_queue.submit(rows(2), known=known)
+        with connect(self.db_path) as conn:
+            conn.execute("UPDATE jobs SET status = ? WHERE job_id = ?", (JOB_CREATED, job_id))
+
+        job_queue = self.queue()
+        recorder = Recorder(job_queue)
+        job_queue.start()
+        self.assertTrue(recorder.finished.wait(5))
+        events = [event for event, data in recorder.events]
+        self.assertEqual(events, ['result', 'result', 'finished'])
+        self.assertEqual(recorder.results()[0]['error'], 'invalid')
+
+    def test_known_results_before_finished(self):
+        job_queue = self.queue()
+        recorder = Recorder(job_queue)
+        known = [{'rowIndex': row, 'igUsername': f'user{row}', 'success': False, 'error': 'invalid'} for row in (2, 3)]
+        job_queue.submit(rows(2), known=known)
+        self.assertTrue(recorder.finished.wait(5))
+        self.assertEqual([event for event, data in recorder.events], ['result', 'result', 'finished'])
+
+    def test_prepare_failure_fails_remaining_rows(self):
+        job_queue = self.queue(prepare=lambda: (False, '無法初始化瀏覽器'))
+        recorder = Recorder(job_queue)
+        job_id = job_queue.submit(rows(2))
+        self.assertTrue(recorder.finished.wait(5))
+        job = job_queue.get_job(job_id)
+        self.assertEqual(job['status'], JOB_FAILED)
+        self.assertEqual([result['error'] for result in recorder.results()], ['無法初始化瀏覽器'] * 2)
+        self.assertEqual(job_queue.pending_rows(), 0)
+
+    def test_job_aborted_fails_remaining_rows(self):
+        def handler(dm_item):
+            result = dict(sent(dm_item), success=False, error='瀏覽器無法啟動')
+            raise JobAborted('瀏覽器無法啟動', result)
+
+        job_queue = self.queue(handler=handler)
+        recorder = Recorder(job_queue)
+        job_id = job_queue.submit(rows(3))
+        self.assertTrue(recorder.finished.wait(5))
+        job = job_queue.get_job(job_id)
+        self.assertEqual(job['status'], JOB_FAILED)
+        self.assertEqual(job['error'], '瀏覽器無法啟動')
+        self.assertEqual(job['summary'], {'total': 3, 'success': 0, 'failed': 3})
+
+    def test_pending_rows_counts_only_active_jobs(self):
+        job_queue = self.queue()
+        job_queue._ensure_worker = lambda: None
+        job_id = job_queue.submit(rows(2))
+        self.assertEqual(job_queue.pending_rows(), 2)
+        job_queue._update_job(job_id, JOB_FAILED, 'stopped')
+        self.assertEqual(job_queue.pending_rows(), 0)
+        self.assertEqual([row['state'] for row in job_queue.get_job(job_id)['rows']], [ROW_PENDING, ROW_PENDING])
+
+    def test_throttle_defers_rows(self):
+        waits = [(0.05, '發送間隔太短'), (0, None), (0, None)]
+        job_queue = self.queue(throttle=lambda: waits.pop(0) if waits else (0, None))
+        recorder = Recorder(job_queue)
+        job_id = job_queue.submit(rows(2))
+        self.assertTrue(recorder.finished.wait(5))
+        self.assertEqual(job_queue.get_job(job_id)['summary']['success'], 2)
+        self.assertEqual(job_queue.get_job(job_id)['status'], JOB_COMPLETED)
+
+
+if __name__ == '__main__':
+    unittest.main()
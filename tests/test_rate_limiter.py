@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+發送限制的滾動視窗、重啟還原與 schedule() 測試（以假的時鐘取代 time，不需實際等待）
+執行: python -m pytest tests 或 python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rate_limiter
+from rate_limiter import RateLimiter, HOUR, DAY, LIMIT_INTERVAL, LIMIT_HOURLY, LIMIT_DAILY
+
+
+class FakeClock(object):
+    """monotonic 與實際時間以相同速度前進；restart() 模擬重啟後 monotonic 從不同的起點開始"""
+
+    def __init__(self):
+        self.mono = 1000.0
+        self.wall = 1700000000.0
+
+    def monotonic(self):
+        return self.mono
+
+    def time(self):
+        return self.wall
+
+    def advance(self, seconds):
+        self.mono += seconds
+        self.wall += seconds
+
+    def restart(self, downtime=0):
+        self.mono = 50.0
+        self.wall += downtime
+
+
+class MemoryStore(object):
+    def __init__(self):
+        self.state = {}
+
+    def load_state(self, key, default=None):
+        return self.state.get(key, default)
+
+    def save_state(self, key, value):
+        self.state[key] = value
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(rate_limiter, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_min_interval(self):
+        limiter = RateLimiter(None, None, 60)
+        self.assertEqual(limiter.check(), (0, None))
+        limiter.record()
+        self.assertEqual(limiter.check(), (60, LIMIT_INTERVAL))
+        self.clock.advance(45)
+        self.assertEqual(limiter.check(), (15, LIMIT_INTERVAL))
+        self.clock.advance(15)
+        self.assertEqual(limiter.check(), (0, None))
+
+    def test_random_interval_between_min_and_max(self):
+        limiter = RateLimiter(None, None, 60, 180)
+        with mock.patch.object(rate_limiter.random, 'randint', return_value=137) as randint:
+            limiter.record()
+        randint.assert_called_once_with(60, 180)
+        self.assertEqual(limiter.check(), (137, LIMIT_INTERVAL))
+
+    def test_hourly_rolling_window(self):
+        limiter = RateLimiter(None, 3, 0)
+        for _ in range(3):
+            limiter.record()
+            self.clock.advance(600)
+        # 第一筆在 1800 秒前發送，再過 1800 秒離開一小時視窗
+        self.assertEqual(limiter.check(), (HOUR - 1800, LIMIT_HOURLY))
+        self.clock.advance(HOUR - 1800)
+        self.assertEqual(limiter.check(), (0, None))
+        self.assertEqual(limiter.counts(), {'hourly': 2, 'daily': 3})
+
+    def test_daily_limit_outranks_shorter_waits(self):
+        limiter = RateLimiter(2, 10, 60)
+        limiter.record()
+        self.clock.advance(2 * HOUR)
+        limiter.record()
+        wait, reason = limiter.check()
+        self.assertEqual(reason, LIMIT_DAILY)
+        self.assertEqual(wait, DAY - 2 * HOUR)
+
+    def test_zero_limit_blocks(self):
+        limiter = RateLimiter(None, 0, 0)
+        wait, reason = limiter.check()
+        self.assertEqual(reason, LIMIT_HOURLY)
+        self.assertEqual(wait, HOUR)
+
+    def test_restart_restores_sends_and_interval(self):
+        store = MemoryStore()
+        limiter = RateLimiter(None, 2, 60, 180, store=store)
+        with mock.patch.object(rate_limiter.random, 'randint', return_value=100):
+            limiter.record()
+            self.clock.advance(30)
+            limiter.record()
+
+        self.clock.restart(downtime=20)
+        restored = RateLimiter(None, 2, 60, 180, store=store)
+        self.assertEqual(restored.counts(), {'hourly': 2, 'daily': 2})
+        self.assertEqual(restored.interval, 100)
+        # 最後一筆發送於 20 秒前，間隔 100 秒；每小時上限要等第一筆（50 秒前）離開視窗
+        self.assertEqual(restored.check(), (HOUR - 50, LIMIT_HOURLY))
+
+    def test_restart_drops_sends_older_than_a_day(self):
+        store = MemoryStore()
+        limiter = RateLimiter(None, None, 0, store=store)
+        limiter.record()
+        self.clock.restart(downtime=DAY + 1)
+        self.assertEqual(RateLimiter(None, None, 0, store=store).counts(), {'hourly': 0, 'daily': 0})
+
+    def test_schedule_applies_limits(self):
+        limiter = RateLimiter(None, 2, 60)
+        limiter.record()
+        self.clock.advance(10)
+        # 下一筆等最短間隔；再下一筆受每小時上限限制，要等第一筆離開視窗
+        self.assertEqual(limiter.schedule(2, pace=5), [50, HOUR - 10])
+
+    def test_schedule_uses_chosen_interval_then_pace(self):
+        limiter = RateLimiter(None, None, 60, 180)
+        with mock.patch.object(rate_limiter.random, 'randint', return_value=150):
+            limiter.record()
+        self.assertEqual(limiter.schedule(3, pace=120), [150, 270, 390])
+        # schedule() 不會改變實際的發送紀錄
+        self.assertEqual(limiter.counts()['daily'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+試算表回寫的批次測試（使用 MemorySink，不需要 Google 憑證）
+執行: python -m pytest tests 或 python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sheet_writer import SheetWriter, MemorySink, STATUS_SENT, STATUS_FAILED
+
+
+def result(row, success=True, error=None):
+    return {'rowIndex': row, 'igUsername': f'user{row}', 'success': success, 'error': error}
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+class FailingSink(MemorySink):
+    """前幾次寫入拋出例外"""
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def write(self, updates):
+        if self.failures:
+            self.failures -= 1
+            raise IOError('quota exceeded')
+        super().write(updates)
+
+
+class SheetWriterTest(unittest.TestCase):
+
+    def test_writes_when_batch_is_full(self):
+        sink = MemorySink()
+        writer = SheetWriter(sink, batch_size=50, flush_interval=3600)
+        for row in range(1, 50):
+            writer.add(result(row))
+        time.sleep(0.2)
+        self.assertEqual(sink.batches, [])
+
+        writer.add(result(50))
+        self.assertTrue(wait_for(lambda: len(sink.batches) == 1))
+        self.assertEqual([row for row, values in sink.batches[0]], list(range(1, 51)))
+
+    def test_500_rows_in_ten_batches(self):
+        sink = MemorySink()
+        writer = SheetWriter(sink, batch_size=50, flush_interval=3600)
+        for start in range(1, 501, 50):
+            for row in range(start, start + 50):
+                writer.add(result(row))
+            self.assertTrue(wait_for(lambda: sink.batches and sink.batches[-1][-1][0] == start + 49))
+        self.assertEqual(len(sink.batches), 10)
+        self.assertEqual(len(sink.cells), 500)
+        self.assertEqual(writer.stats['rows'], 500)
+
+    def test_flush_on_finish_writes_partial_batch(self):
+        sink = MemorySink()
+        writer = SheetWriter(sink, batch_size=50, flush_interval=3600)
+        for row in range(2, 9):
+            writer.add(result(row, success=row % 2 == 0, error=None if row % 2 == 0 else '私人帳號'))
+        self.assertTrue(writer.flush())
+        self.assertEqual(len(sink.batches), 1)
+        self.assertEqual(sorted(sink.cells), list(range(2, 9)))
+        self.assertEqual(sink.cells[2][:2], [STATUS_SENT, ''])
+        self.assertEqual(sink.cells[3][:2], [STATUS_FAILED, '私人帳號'])
+        # 沒有暫存的結果時不呼叫 API
+        self.assertTrue(writer.flush())
+        self.assertEqual(len(sink.batches), 1)
+
+    def test_flush_after_interval(self):
+        sink = MemorySink()
+        writer = SheetWriter(sink, batch_size=50, flush_interval=0.1)
+        writer.add(result(2))
+        self.assertTrue(wait_for(lambda: len(sink.batches) == 1))
+        self.assertEqual(sink.batches[0][0][0], 2)
+
+    def test_no_timer_flush_by_default(self):
+        sink = MemorySink()
+        writer = SheetWriter(sink, batch_size=50)
+        writer.add(result(2))
+        time.sleep(0.2)
+        self.assertEqual(sink.batches, [])
+
+    def test_request_flush_writes_on_writer_thread(self):
+        class SlowSink(MemorySink):
+            def write(self, updates):
+                time.sleep(0.3)
+                super().write(updates)
+
+        sink = SlowSink()
+        writer = SheetWriter(sink, batch_size=50)
+        for row in range(2, 5):
+            writer.add(result(row))
+        start = time.monotonic()
+        writer.request_flush()
+        self.assertLess(time.monotonic() - start, 0.1)
+        self.assertTrue(wait_for(lambda: len(sink.batches) == 1))
+        self.assertEqual(sorted(sink.cells), [2, 3, 4])
+
+    def test_keeps_latest_result_per_row(self):
+        sink = MemorySink()
+        writer = SheetWriter(sink, batch_size=50, flush_interval=3600)
+        writer.add(result(2, success=False, error='逾時'))
+        writer.add(result(2))
+        writer.add({'rowIndex': 0, 'success': True})
+        writer.add({'rowIndex': None, 'success': True})
+        writer.flush()
+        self.assertEqual(sink.batches, [[(2, sink.cells[2])]])
+        self.assertEqual(sink.cells[2][0], STATUS_SENT)
+
+    def test_failed_write_is_retried(self):
+        sink = FailingSink(failures=1)
+        writer = SheetWriter(sink, batch_size=50, flush_interval=3600)
+        writer.add(result(2))
+        self.assertFalse(writer.flush())
+        self.assertEqual(writer.stats['errors'], 1)
+        self.assertTrue(writer.flush())
+        self.assertEqual(list(sink.cells), [2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+/send_dms 資料驗證測試：帳號正規化（@、個人頁面網址）、保留路徑、rowIndex 與訊息內容、重複的 rowIndex
+執行: python -m pytest tests 或 python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from validation import (ValidationError, MAX_MESSAGE_LENGTH, normalize_username, normalize_row_index,
+                        normalize_content, validate_dm_item, validate_dm_list)
+
+
+def item(row=2, username='test_user', content='您好'):
+    return {'rowIndex': row, 'igUsername': username, 'dmContent': content}
+
+
+class NormalizeUsernameTest(unittest.TestCase):
+
+    def test_plain_and_prefixed(self):
+        self.assertEqual(normalize_username('test_user'), 'test_user')
+        self.assertEqual(normalize_username('  @Test.User '), 'test.user')
+
+    def test_profile_urls(self):
+        for value in ('https://www.instagram.com/test_user/',
+                      'https://www.instagram.com/test_user/?igsh=abc123',
+                      'http://instagram.com/test_user',
+                      'instagram.com/test_user',
+                      'www.instagram.com/Test_User/reels/',
+                      'https://m.instagram.com/test_user'):
+            self.assertEqual(normalize_username(value), 'test_user', value)
+
+    def test_reserved_paths(self):
+        for value in ('https://www.instagram.com/p/Cxyz/', 'instagram.com/reel/abc',
+                      'https://www.instagram.com/stories/test_user/', 'https://www.instagram.com/explore/',
+                      'https://www.instagram.com/direct/inbox/', 'https://www.instagram.com/'):
+            with self.assertRaises(ValidationError, msg=value):
+                normalize_username(value)
+
+    def test_other_hosts(self):
+        with self.assertRaises(ValidationError):
+            normalize_username('https://facebook.com/test_user')
+        with self.assertRaises(ValidationError):
+            normalize_username('https://instagram.com.evil.example/test_user')
+
+    def test_invalid_values(self):
+        for value in ('', '  ', '@', 'has space', 'a' * 31, 'bad-dash', 123, None):
+            with self.assertRaises(ValidationError, msg=repr(value)):
+                normalize_username(value)
+
+
+class NormalizeFieldsTest(unittest.TestCase):
+
+    def test_row_index(self):
+        self.assertEqual(normalize_row_index(5), 5)
+        self.assertEqual(normalize_row_index(' 7 '), 7)
+        self.assertEqual(normalize_row_index(3.0), 3)
+        for value in (0, -1, 2.5, 'abc', '', True, None):
+            with self.assertRaises(ValidationError, msg=repr(value)):
+                normalize_row_index(value)
+
+    def test_content(self):
+        self.assertEqual(normalize_content('  第一行\n第二行  '), '第一行\n第二行')
+        self.assertEqual(len(normalize_content('x' * MAX_MESSAGE_LENGTH)), MAX_MESSAGE_LENGTH)
+        for value in ('', ' \n ', 'x' * (MAX_MESSAGE_LENGTH + 1), 42):
+            with self.assertRaises(ValidationError, msg=repr(value)[:20]):
+                normalize_content(value)
+
+    def test_item_keeps_other_fields(self):
+        result = validate_dm_item(dict(item(row='4', username='@Shop'), storeName='測試餐廳'))
+        self.assertEqual(result, {'rowIndex': 4, 'igUsername': 'shop', 'dmContent': '您好', 'storeName': '測試餐廳'})
+
+    def test_item_missing_fields(self):
+        for field in ('rowIndex', 'igUsername', 'dmContent'):
+            dm_item = item()
+            del dm_item[field]
+            with self.assertRaises(ValidationError, msg=field):
+                validate_dm_item(dm_item)
+        with self.assertRaises(ValidationError):
+            validate_dm_item(['not', 'a', 'dict'])
+
+
+class ValidateListTest(unittest.TestCase):
+
+    def test_mixed_batch(self):
+        items, errors = validate_dm_list([
+            item(2, 'ok_user'),
+            item(3, 'https://instagram.com/p/Cxyz/'),
+            'not a row',
+            item('4', '@second'),
+        ])
+        self.assertEqual([dm_item and dm_item['igUsername'] for dm_item in items], ['ok_user', None, None, 'second'])
+        self.assertEqual([error['index'] for error in errors], [1, 2])
+        # 錯誤保留原始值
+        self.assertEqual(errors[0]['igUsername'], 'https://instagram.com/p/Cxyz/')
+        self.assertEqual(errors[0]['rowIndex'], 3)
+        self.assertIsNone(errors[1]['rowIndex'])
+
+    def test_duplicate_row_index(self):
+        items, errors = validate_dm_list([item(3, 'foo'), item('3', 'bar'), item(4, 'baz')])
+        self.assertIsNone(items[1])
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0]['index'], 1)
+        self.assertIn('重複', errors[0]['error'])
+        # 無效的資料列不佔用 rowIndex
+        items, errors = validate_dm_list([item(3, 'https://instagram.com/p/x/'), item(3, 'bar')])
+        self.assertEqual([error['index'] for error in errors], [0])
+        self.assertEqual(items[1]['igUsername'], 'bar')
+
+    def test_empty_and_non_list(self):
+        self.assertEqual(validate_dm_list([]), ([], []))
+        with self.assertRaises(ValidationError):
+            validate_dm_list({'rowIndex': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
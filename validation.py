@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+/send_dms 資料驗證
+在開啟瀏覽器之前一次檢查所有資料列：補齊欄位型別、正規化帳號（去除 @、個人頁面網址與空白），
+無效的資料列附上錯誤原因直接回報，不必等到瀏覽器啟動與登入後才在發送迴圈中失敗
+"""
+
+import re
+from urllib.parse import urlsplit
+
+# Instagram 帳號：英數字、句點與底線，最多 30 個字元
+USERNAME_PATTERN = re.compile(r'^[a-z0-9._]{1,30}$')
+# Instagram 私訊的字數上限
+MAX_MESSAGE_LENGTH = 1000
+INSTAGRAM_HOSTS = ('instagram.com', 'www.instagram.com', 'm.instagram.com')
+# 不是個人頁面的路徑（貼文、Reels、限時動態等）
+RESERVED_PATHS = {'p', 'reel', 'reels', 'tv', 'stories', 'explore', 'direct', 'accounts'}
+
+
+class ValidationError(Exception):
+    """單一資料列的驗證錯誤"""
+    pass
+
+
+def normalize_username(value):
+    """'@User '、'instagram.com/user'、'https://www.instagram.com/user/?igsh=...' -> 'user'"""
+    if not isinstance(value, str):
+        raise ValidationError('igUsername 必須是字串')
+    username = value.strip()
+
+    if '/' in username:
+        url = urlsplit(username if '://' in username else 'https://' + username)
+        if url.hostname not in INSTAGRAM_HOSTS:
+            raise ValidationError(f'不是 Instagram 網址: {value}')
+        segments = [segment for segment in url.path.split('/') if segment]
+        if not segments or segments[0].lower() in RESERVED_PATHS:
+            raise ValidationError(f'不是 Instagram 個人頁面網址: {value}')
+        username = segments[0]
+
+    username = username.lstrip('@').strip().lower()
+    if not username:
+        raise ValidationError('缺少 igUsername')
+    if not USERNAME_PATTERN.match(username):
+        raise ValidationError(f'igUsername 格式錯誤: {value}')
+    return username
+
+
+def normalize_row_index(value):
+    """rowIndex 必須是正整數，接受數字字串（例如 '5'）"""
+    if isinstance(value, bool):
+        raise ValidationError('rowIndex 必須是正整數')
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value.strip())
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if not isinstance(value, int) or value < 1:
+        raise ValidationError('rowIndex 必須是正整數')
+    return value
+
+
+def normalize_content(value):
+    """去除訊息前後空白（保留中間的換行），不可為空或超過字數上限"""
+    if not isinstance(value, str):
+        raise ValidationError('dmContent 必須是字串')
+    content = value.strip()
+    if not content:
+        raise ValidationError('缺少 dmContent')
+    if len(content) > MAX_MESSAGE_LENGTH:
+        raise ValidationError(f'dmContent 超過 {MAX_MESSAGE_LENGTH} 字')
+    return content
+
+
+def validate_dm_item(dm_item):
+    """驗證並正規化單一資料列，回傳新的 dm_item（保留其他欄位），無效時拋出 ValidationError"""
+    if not isinstance(dm_item, dict):
+        raise ValidationError('資料列必須是物件')
+    for field in ('rowIndex', 'igUsername', 'dmContent'):
+        if dm_item.get(field) is None:
+            raise ValidationError(f'缺少 {field}')
+
+    item = dict(dm_item)
+    item['rowIndex'] = normalize_row_index(dm_item['rowIndex'])
+    item['igUsername'] = normalize_username(dm_item['igUsername'])
+    item['dmContent'] = normalize_content(dm_item['dmContent'])
+    return item
+
+
+def validate_dm_list(dm_list):
+    """
+    一次驗證整批資料，回傳 (items, errors)
+    items 與 dm_list 一一對應，無效的資料列為 None；
+    errors 為 [{'index', 'rowIndex', 'igUsername', 'error'}]，rowIndex / igUsername 為原始值
+    """
+    if not isinstance(dm_list, list):
+        raise ValidationError('data 必須是陣列')
+
+    items = []
+    errors = []
+    seen_rows = set()
+    for index, dm_item in enumerate(dm_list):
+        try:
+            item = validate_dm_item(dm_item)
+            if item['rowIndex'] in seen_rows:
+                raise ValidationError(f"rowIndex {item['rowIndex']} 重複")
+            seen_rows.add(item['rowIndex'])
+        except ValidationError as e:
+            raw = dm_item if isinstance(dm_item, dict) else {}
+            items.append(None)
+            errors.append({
+                'index': index,
+                'rowIndex': raw.get('rowIndex'),
+                'igUsername': raw.get('igUsername'),
+                'error': str(e)
+            })
+            continue
+        items.append(item)
+    return items, errors
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+自訂等待條件
+取代固定秒數的 time.sleep()，改為等待頁面上可觀察到的狀態（URL 變化、元素出現、訊息送出、網路閒置）
+用法與 selenium 的 expected_conditions 相同：WebDriverWait(driver, timeout).until(條件)
+"""
+
+import time
+
+
+class url_left(object):
+    """URL 不再包含指定片段（例如登入後離開 /accounts/login/）"""
+
+    def __init__(self, fragment):
+        self.fragment = fragment
+
+    def __call__(self, driver):
+        return self.fragment not in driver.current_url
+
+
+class element_focused(object):
+    """指定元素已取得焦點"""
+
+    def __init__(self, element):
+        self.element = element
+
+    def __call__(self, driver):
+        return driver.execute_script("return document.activeElement === arguments[0];", self.element)
+
+
+class textbox_contains(object):
+    """輸入框內容已包含指定文字；exact 時內容必須與文字完全相同（忽略空白差異）"""
+
+    def __init__(self, element, text, exact=False):
+        self.element = element
+        self.text = ' '.join(text.split())
+        self.exact = exact
+
+    def __call__(self, driver):
+        value = driver.execute_script(
+            "var el = arguments[0]; return el.value !== undefined ? el.value : el.innerText;",
+            self.element
+        )
+        value = ' '.join((value or '').split())
+        return value == self.text if self.exact else self.text in value
+
+
+class message_sent(object):
+    """
+    訊息已送出：輸入框已清空，且對話串中出現訊息內容
+    只比對訊息開頭片段，避免長訊息在頁面上被截斷或換行時比對失敗
+    """
+
+    def __init__(self, textbox_xpath, message, snippet_length=30):
+        self.textbox_xpath = textbox_xpath
+        self.snippet = ' '.join(message.split())[:snippet_length]
+
+    def __call__(self, driver):
+        return driver.execute_script("""
+            var box = document.evaluate(arguments[0], document, null,
+                                        XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+            var pending = box ? (box.value !== undefined ? box.value : box.innerText) : '';
+            if (pending && pending.trim().length > 0) return false;
+            var text = (document.body.innerText || '').replace(/\\s+/g, ' ');
+            return text.indexOf(arguments[1]) !== -1;
+        """, self.textbox_xpath, self.snippet)
+
+
+class network_idle(object):
+    """
+    頁面載入完成且一段時間內沒有新的網路請求
+    以 performance resource entries 的數量判斷，數量在 idle_time 秒內沒有增加即視為閒置
+    """
+
+    def __init__(self, idle_time=0.5):
+        self.idle_time = idle_time
+        self.last_count = None
+        self.stable_since = None
+
+    def __call__(self, driver):
+        state = driver.execute_script(
+            "return [document.readyState, performance.getEntriesByType('resource').length];"
+        )
+        ready_state, count = state[0], state[1]
+        now = time.monotonic()
+
+        if ready_state != 'complete' or count != self.last_count:
+            self.last_count = count
+            self.stable_since = now
+            return False
+
+        return now - self.stable_since >= self.idle_time
+